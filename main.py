@@ -4,7 +4,8 @@ import sys
 import subprocess
 import time
 import requests
-from src.engine.main import run_engine
+from src.engine.jobs import JobManager, SUCCEEDED
+from src.engine.runner import run_suite
 
 # Configuration
 SPEC_FILE = "docs/project_sample.md"
@@ -24,6 +25,12 @@ api_key = st.sidebar.text_input("OpenAI API Key", type="password", help="Enter y
 # Target Host Configuration
 target_host = st.sidebar.text_input("Target Service URL", value="http://localhost:8000")
 
+# Generation Parallelism
+concurrency = st.sidebar.number_input("Parallel LLM Requests", min_value=1, max_value=32, value=4, help="Max requirements generated concurrently.")
+
+# Execution Parallelism
+test_workers = st.sidebar.number_input("Parallel Test Workers", min_value=1, max_value=32, value=min(os.cpu_count() or 1, 8), help="Pytest processes the suite is sharded across.")
+
 if st.sidebar.button("Start Mock Service (Local)"):
     try:
         # Start uvicorn in a subprocess
@@ -39,6 +46,55 @@ if st.sidebar.button("Stop Mock Service"):
     subprocess.run(["pkill", "-f", "uvicorn"])
     st.sidebar.warning("Service stopped.")
 
+@st.cache_resource
+def get_job_manager():
+    # One manager per server process: shared by every session, survives reruns
+    return JobManager(workers=int(os.getenv("AXIOM_JOB_WORKERS", "2")))
+
+job_manager = get_job_manager()
+
+def submit_generation():
+    job_id = job_manager.submit(SPEC_FILE, TEST_FILE, target_host, api_key=api_key or None, concurrency=concurrency)
+    st.session_state["generation_job"] = job_id
+    return job_id
+
+def watch_job(job_id, progress_bar=None, start=0, end=100):
+    """
+    Follows a background generation job until it finishes, rendering each test as it arrives and
+    mapping its progress onto the [start, end] range of `progress_bar`. Returns the finished job.
+    """
+    status = st.empty()
+    live_tests = st.container()
+    shown, version = 0, -1
+    while True:
+        job = job_manager.wait(job_id, version, timeout=1.0)
+        version = job.version
+        if progress_bar is not None:
+            progress_bar.progress(int(start + (end - start) * job.progress))
+        status.write(f"Job {job.id} {job.status}: {job.completed}/{job.total} tests generated")
+        for test in job.tests[shown:]:
+            with live_tests.expander(f"{test['requirement_id']}: {test['name']}"):
+                # Parametrized variants have no code of their own; their name points at the shared test
+                st.code(test["code"] or f"# Covered by {test['name']}", language="python")
+        shown = len(job.tests)
+        if job.done:
+            status.empty()
+            return job
+
+def show_test_report(report):
+    """Renders a merged run_suite() report."""
+    st.write(f"{report['passed']} passed, {report['failed']} failed, {report['error']} errors, "
+             f"{report['skipped']} skipped in {report['wall_s']}s on {report['workers']} workers "
+             f"({report['serial_s']}s of test time)")
+    failures = [result for result in report["tests"] if result["outcome"] in ("failed", "error")]
+    for result in failures:
+        with st.expander(f"{result['outcome'].upper()}: {result['name']}"):
+            st.text(result["message"])
+    for shard in report["shards"]:
+        if shard["shard"] in report["crashed_shards"]:
+            st.error(f"Shard {shard['shard']} exited with code {shard['returncode']}")
+            st.text(shard["stdout"] + shard["stderr"])
+
 # Main Area
 col1, col2 = st.columns(2)
 
@@ -66,23 +122,27 @@ with col2:
     
     # Step 2: Generate
     if st.button("Generate Test Suite"):
-        with st.spinner("Parsing requirements & generating code..."):
-            try:
-                # Save latest spec
-                with open(SPEC_FILE, "w") as f:
-                    f.write(edited_spec)
-                
-                run_engine(SPEC_FILE, TEST_FILE, target_host, api_key=api_key)
-                st.success("Test suite generated successfully!")
-                
-                # Show generated code snippet
-                if os.path.exists(TEST_FILE):
-                    with open(TEST_FILE, "r") as f:
-                        code = f.read()
+        # Save latest spec
+        with open(SPEC_FILE, "w") as f:
+            f.write(edited_spec)
+        submit_generation()
+
+    # Generation runs in the background; a rerun of the page just re-attaches to the job
+    job = job_manager.get(st.session_state.get("generation_job", ""))
+    if job is not None:
+        if not job.done:
+            job = watch_job(job.id, st.progress(0))
+        if job.status != SUCCEEDED:
+            st.error(f"Engine failed: {job.error}")
+        else:
+            st.success("Test suite generated successfully!")
+            
+            # Show generated code snippet
+            if os.path.exists(TEST_FILE):
+                with open(TEST_FILE, "r") as f:
+                    code = f.read()
+                with st.expander("Generated suite"):
                     st.code(code, language="python")
-                    
-            except Exception as e:
-                st.error(f"Engine failed: {e}")
 
     # Step 3: Run
     if st.button("Run Pytest"):
@@ -90,21 +150,15 @@ with col2:
             st.warning("No test file found. Generate it first.")
         else:
             with st.spinner("Running tests..."):
-                result = subprocess.run(
-                    [sys.executable, "-m", "pytest", TEST_FILE, "-v"], 
-                    capture_output=True, 
-                    text=True
-                )
+                report = run_suite(TEST_FILE, workers=test_workers, target_host=target_host)
                 
-                if result.returncode == 0:
+                if report["ok"]:
                     st.success("All tests PASSED")
                 else:
                     st.error("Tests FAILED (Check Output)")
                 
-                st.subheader("Console Output")
-                st.text(result.stdout)
-                if result.stderr:
-                    st.text(result.stderr)
+                st.subheader("Results")
+                show_test_report(report)
 
     st.markdown("---")
     st.markdown("### Automate functionality")
@@ -135,7 +189,9 @@ with col2:
             st.write("🔄 Generating Tests...")
             with open(SPEC_FILE, "w") as f:
                 f.write(edited_spec)
-            run_engine(SPEC_FILE, TEST_FILE, target_host, api_key=api_key)
+            job = watch_job(submit_generation(), progress_bar, start=33, end=66)
+            if job.status != SUCCEEDED:
+                raise RuntimeError(job.error)
             st.write("✅ Tests generated.")
         except Exception as e:
             st.error(f"Generation Error: {e}")
@@ -146,16 +202,12 @@ with col2:
         # 3. Run
         try:
             st.write("🔄 Running Pytest...")
-            result = subprocess.run(
-                [sys.executable, "-m", "pytest", TEST_FILE, "-v"], 
-                capture_output=True, 
-                text=True
-            )
+            report = run_suite(TEST_FILE, workers=test_workers, target_host=target_host)
             st.write("✅ Execution complete.")
             
-            st.code(result.stdout)
+            show_test_report(report)
             
-            if result.returncode != 0:
+            if not report["ok"]:
                  st.warning("⚠️ Tests Failed (Expected for Intentional Bug)")
             else:
                  st.success("Tests Passed!")
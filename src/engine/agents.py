@@ -1,113 +1,218 @@
-import os
 import sys
-from typing import List
-from langchain_openai import ChatOpenAI
+from typing import Dict, List
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
-from .models import Requirement, TestScenario, TestCase
-
-# Helper to get LLM (mock or real)
-def get_llm(api_key: str = None):
-    if not api_key:
-        api_key = os.getenv("OPENAI_API_KEY")
-    
-    if not api_key:
-        # Fallback
-        print("WARNING: OPENAI_API_KEY not found. Using dummy LLM.")
-        return ChatOpenAI(model="gpt-3.5-turbo", api_key="sk-dummy") 
-    return ChatOpenAI(model="gpt-4-turbo", temperature=0, api_key=api_key)
+from .models import Requirement, TestScenario, TestCase, TestScenarioList, TestCaseList
+from . import llm as llm_module
+from .routing import ModelRouter, complexity
+from . import telemetry
+from .batching import AdaptiveBatcher
+from .pooling import CLIENT_FIXTURES, use_pooled_client
+from .validation import validate_test_code
+
+def _log_failure(e: Exception):
+    """Full tracebacks for LLM failures are only printed in debug mode."""
+    if llm_module.DEBUG:
+        import traceback
+        traceback.print_exc()
+
+# Markers used by the fallback paths below, so callers can tell placeholders from real output
+FALLBACK_SCENARIO_PREFIX = "SCN-FALLBACK-"
+FALLBACK_TEST_DESCRIPTION = "Fallback test due to LLM failure"
+
+def is_fallback(test_case: TestCase) -> bool:
+    """True if the test case (or the scenario it came from) is a placeholder produced by an LLM failure."""
+    return test_case.description == FALLBACK_TEST_DESCRIPTION or test_case.scenario_id.startswith(FALLBACK_SCENARIO_PREFIX)
+
+def _requirement_complexity(req: Requirement) -> float:
+    return complexity(f"{req.title}\n{req.description}", req.priority)
+
+def _scenario_complexity(scenario: TestScenario) -> float:
+    return complexity("\n".join([scenario.description, *scenario.steps, scenario.expected_result]))
+
+def _missing(wanted, returned) -> str:
+    """Routing check for batched replies: names the requested ids the model left out, if any."""
+    missing = sorted(set(wanted) - set(returned))
+    return f"incomplete_batch: missing {', '.join(missing)}" if missing else None
 
 class RequirementsAnalyst:
     """
     Agent responsible for breaking down Requirements into logical Test Scenarios using an LLM.
     """
-    def __init__(self, api_key: str = None):
-        self.llm = get_llm(api_key)
+    def __init__(self, api_key: str = None, cache=None, batch_size: int = 1):
+        self.router = ModelRouter(api_key)
+        self.cache = cache
         self.parser = PydanticOutputParser(pydantic_object=TestScenario)
-        
+        self.list_parser = PydanticOutputParser(pydantic_object=TestScenarioList)
+        self.batcher = AdaptiveBatcher(batch_size=batch_size)
+
+        system_prompt = "You are an expert QA Analyst. Your job is to analyze requirements and break them down into detailed, logical test scenarios (Given/When/Then). You must anticipate edge cases and security vectors. Output must be valid JSON conforming to the schema."
         self.prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are an expert QA Analyst. Your job is to analyze requirements and break them down into detailed, logical test scenarios (Given/When/Then). You must anticipate edge cases and security vectors. Output must be valid JSON conforming to the schema."),
+            ("system", system_prompt),
             ("user", "Requirement: {requirement}\n\n{format_instructions}")
         ])
+        self.batch_prompt = ChatPromptTemplate.from_messages([
+            ("system", system_prompt + " You will receive several requirements as a JSON list. Return exactly one scenario per requirement, copying its `id` into `requirement_id`."),
+            ("user", "Requirements: {requirements}\n\n{format_instructions}")
+        ])
 
     def analyze(self, req: Requirement) -> TestScenario:
-        chain = self.prompt | self.llm | self.parser
-        
         try:
-            return chain.invoke({
-                "requirement": req.json(),
-                "format_instructions": self.parser.get_format_instructions()
-            })
+            with telemetry.span("analyze", requirement_id=req.id):
+                return self.router.invoke("analyze", self.prompt, {
+                    "requirement": req.json(),
+                    "format_instructions": self.parser.get_format_instructions()
+                }, output_parser=self.parser, cache=self.cache, complexity_score=_requirement_complexity(req),
+                    check=lambda scenario: None if scenario.steps else "no_steps: scenario has no steps")
         except Exception as e:
             # Fallback for demo stability if LLM fails (e.g. no auth)
-            import traceback
-            traceback.print_exc()
+            _log_failure(e)
+            telemetry.incr("fallbacks", kind="SCN-FALLBACK", requirement_id=req.id)
             print(f"LLM Call failed: {e}. Returning fallback scenario.", file=sys.stderr)
             return TestScenario(
                 requirement_id=req.id,
-                scenario_id=f"SCN-FALLBACK-{req.id}",
+                scenario_id=f"{FALLBACK_SCENARIO_PREFIX}{req.id}",
                 description=f"Fallback scenario for {req.title}",
                 steps=["Check logs", "Verify failure"],
                 expected_result="Error",
                 test_data={}
             )
 
+    def _analyze_batch(self, reqs: List[Requirement]) -> Dict[str, TestScenario]:
+        with telemetry.span("analyze_batch", size=len(reqs)):
+            wanted = {req.id for req in reqs}
+            result = self.router.invoke("analyze", self.batch_prompt, {
+                "requirements": "[" + ", ".join(req.json() for req in reqs) + "]",
+                "format_instructions": self.list_parser.get_format_instructions()
+            }, output_parser=self.list_parser, cache=self.cache,
+                complexity_score=max(_requirement_complexity(req) for req in reqs),
+                check=lambda result: _missing(wanted, [scenario.requirement_id for scenario in result.scenarios]))
+        return {scenario.requirement_id: scenario for scenario in result.scenarios if scenario.requirement_id in wanted}
+
+    def analyze_many(self, reqs: List[Requirement]) -> List[TestScenario]:
+        """Analyzes several requirements, packing up to `batcher.batch_size` of them per LLM request."""
+        return self.batcher.run(reqs, self._analyze_batch, self.analyze, key=lambda req: req.id)
+
 class SoftwareTester:
     """
     Agent responsible for converting Test Scenarios into executable Pytest code using an LLM.
+    Every generated test is compiled as soon as it comes back; tests that fail are re-prompted with the
+    error, up to `max_repairs` times each, before falling back to a skipped placeholder.
     """
-    def __init__(self, target_host: str, api_key: str = None):
+    def __init__(self, target_host: str, api_key: str = None, cache=None, batch_size: int = 1, max_repairs: int = 1):
         self.target_host = target_host
-        self.llm = get_llm(api_key)
+        self.max_repairs = max(0, max_repairs)
+        self.router = ModelRouter(api_key)
+        self.cache = cache
         # For code generation, we just want the text, but let's structured output the whole TestCase object
         self.parser = PydanticOutputParser(pydantic_object=TestCase)
+        self.list_parser = PydanticOutputParser(pydantic_object=TestCaseList)
+        self.batcher = AdaptiveBatcher(batch_size=batch_size)
 
+        system_prompt = f"You are a Senior SDET. Write a high-quality, robust Pytest function for the following test scenario. The base URL is defined as `BASE_URL = '{target_host}'`. Send requests through the session-scoped `client` fixture (a keep-alive `httpx.Client`): declare `client` as a parameter of the test function and call e.g. `client.get(f\"{{{{BASE_URL}}}}/path\")`. Never call `httpx.get`/`httpx.post` etc. directly. For async tests use the `async_client` fixture (an `httpx.AsyncClient`) with `@pytest.mark.asyncio`. Include assertion messages. \n\nIMPORTANT: When using f-strings for assertions, ensure you handle quotes correctly. If you access a dictionary with quotes inside an f-string (e.g., {{{{data['key']}}}}), you MUST use a different quote type for the outer string. Example: assert x == y, \"Error: {{{{data['key']}}}}\" (Double quotes outside). Output valid JSON."
         self.prompt = ChatPromptTemplate.from_messages([
-            ("system", f"You are a Senior SDET. Write a high-quality, robust Pytest function for the following test scenario. The base URL is defined as `BASE_URL = '{target_host}'`. Use `httpx` for requests. Include assertion messages. \n\nIMPORTANT: When using f-strings for assertions, ensure you handle quotes correctly. If you access a dictionary with quotes inside an f-string (e.g., {{{{data['key']}}}}), you MUST use a different quote type for the outer string. Example: assert x == y, \"Error: {{{{data['key']}}}}\" (Double quotes outside). Output valid JSON."),
+            ("system", system_prompt),
             ("user", "Scenario: {scenario}\n\n{format_instructions}")
         ])
+        self.batch_prompt = ChatPromptTemplate.from_messages([
+            ("system", system_prompt + " You will receive several scenarios as a JSON list. Return exactly one test per scenario, copying its `requirement_id` and `scenario_id`, and give every test function a unique name."),
+            ("user", "Scenarios: {scenarios}\n\n{format_instructions}")
+        ])
+        self.repair_prompt = ChatPromptTemplate.from_messages([
+            ("system", system_prompt),
+            ("user", "Scenario: {scenario}\n\nYour previous test for this scenario is not valid Python:\n{error}\n\nPrevious code:\n{code}\n\nReturn a corrected test.\n\n{format_instructions}")
+        ])
 
     def write_test(self, scenario: TestScenario) -> TestCase:
-        chain = self.prompt | self.llm | self.parser
-        
         try:
-            return chain.invoke({
-                "scenario": scenario.json(),
-                "format_instructions": self.parser.get_format_instructions()
-            })
+            with telemetry.span("write_test", requirement_id=scenario.requirement_id):
+                # A fast-tier test that does not compile is rewritten by the strong model before any repair
+                test_case = self.router.invoke("write_test", self.prompt, {
+                    "scenario": scenario.json(),
+                    "format_instructions": self.parser.get_format_instructions()
+                }, output_parser=self.parser, cache=self.cache, complexity_score=_scenario_complexity(scenario),
+                    check=lambda test_case: validate_test_code(test_case.code))
+            return self._ensure_valid(scenario, test_case)
         except Exception as e:
-            import traceback
-            traceback.print_exc()
+            _log_failure(e)
             print(f"LLM Call failed: {e}. Returning fallback test.", file=sys.stderr)
-            return TestCase(
-                requirement_id=scenario.requirement_id,
-                scenario_id=scenario.scenario_id,
-                test_function_name=f"test_{scenario.requirement_id.lower().replace('-', '_')}_fallback",
-                code=f"def test_{scenario.requirement_id.lower().replace('-', '_')}_fallback():\n    import pytest\n    # Error: {str(e).replace(chr(39), '').replace(chr(34), '')}\n    pytest.skip('LLM generation failed check comments for details')",
-                description="Fallback test due to LLM failure"
-            )
+            return self._fallback(scenario, e)
+
+    def _fallback(self, scenario: TestScenario, error) -> TestCase:
+        telemetry.incr("fallbacks", kind="TEST-FALLBACK", requirement_id=scenario.requirement_id)
+        return TestCase(
+            requirement_id=scenario.requirement_id,
+            scenario_id=scenario.scenario_id,
+            test_function_name=f"test_{scenario.requirement_id.lower().replace('-', '_')}_fallback",
+            code=f"def test_{scenario.requirement_id.lower().replace('-', '_')}_fallback():\n    import pytest\n    # Error: {' '.join(str(error).replace(chr(39), '').replace(chr(34), '').split())}\n    pytest.skip('LLM generation failed check comments for details')",
+            description=FALLBACK_TEST_DESCRIPTION
+        )
+
+    def _ensure_valid(self, scenario: TestScenario, test_case: TestCase) -> TestCase:
+        """Compiles the test; on failure re-prompts with the error, at most `max_repairs` times."""
+        error = validate_test_code(test_case.code)
+        attempts = 0
+        while error and attempts < self.max_repairs:
+            attempts += 1
+            print(f"Generated test for {scenario.requirement_id} is invalid ({error}); requesting a repair.", file=sys.stderr)
+            try:
+                with telemetry.span("repair_test", requirement_id=scenario.requirement_id, attempt=attempts):
+                    test_case = self.router.invoke("repair", self.repair_prompt, {
+                        "scenario": scenario.json(),
+                        "error": error,
+                        "code": test_case.code,
+                        "format_instructions": self.parser.get_format_instructions()
+                    }, output_parser=self.parser, cache=self.cache)
+            except Exception as e:
+                _log_failure(e)
+                print(f"Repair call failed: {e}.", file=sys.stderr)
+                break
+            error = validate_test_code(test_case.code)
+
+        outcome = "failed" if error else "repaired" if attempts else "ok"
+        telemetry.incr("validation", outcome=outcome)
+        if error:
+            print(f"Generated test for {scenario.requirement_id} is still invalid after {attempts} repair(s): {error}", file=sys.stderr)
+            return self._fallback(scenario, f"Invalid generated code: {error}")
+        return test_case
+
+    def _write_batch(self, scenarios: List[TestScenario]) -> Dict[str, TestCase]:
+        with telemetry.span("write_test_batch", size=len(scenarios)):
+            by_requirement = {scenario.requirement_id: scenario for scenario in scenarios}
+            result = self.router.invoke("write_test", self.batch_prompt, {
+                "scenarios": "[" + ", ".join(scenario.json() for scenario in scenarios) + "]",
+                "format_instructions": self.list_parser.get_format_instructions()
+            }, output_parser=self.list_parser, cache=self.cache,
+                complexity_score=max(_scenario_complexity(scenario) for scenario in scenarios),
+                check=lambda result: _missing(set(by_requirement), [test.requirement_id for test in result.tests]))
+        tests = {test.requirement_id: test for test in result.tests if test.requirement_id in by_requirement}
+        # Only the invalid members of a batch are re-prompted, one by one
+        return {requirement_id: self._ensure_valid(by_requirement[requirement_id], test)
+                for requirement_id, test in tests.items()}
+
+    def write_tests(self, scenarios: List[TestScenario]) -> List[TestCase]:
+        """Writes tests for several scenarios, packing up to `batcher.batch_size` of them per LLM request."""
+        return self.batcher.run(scenarios, self._write_batch, self.write_test, key=lambda scenario: scenario.requirement_id)
 
 class SuiteComposer:
     """
     Agent responsible for assembling the final test suite file using an LLM.
     """
-    def __init__(self, target_host: str, api_key: str = None):
+    def __init__(self, target_host: str, api_key: str = None, cache=None):
         self.target_host = target_host
-        self.llm = get_llm(api_key)
+        self.router = ModelRouter(api_key)
+        self.cache = cache
 
     def compose_suite(self, test_codes: List[str]) -> str:
         prompt = ChatPromptTemplate.from_messages([
-            ("system", f"You are a Senior Release Engineer. Assemble the following Python test functions into a complete, valid `pytest` file. Add all necessary imports (pytest, httpx, etc.). \n\nIMPORTANT: Do NOT define `BASE_URL`. It will be injected dynamically. Use `BASE_URL` in your code assuming it exists. Return ONLY the Python code. Do not include any conversational text."),
+            ("system", f"You are a Senior Release Engineer. Assemble the following Python test functions into a complete, valid `pytest` file. Add all necessary imports (pytest, httpx, etc.). \n\nIMPORTANT: Do NOT define `BASE_URL` or the `client`/`async_client` fixtures. They will be injected dynamically. Use `BASE_URL` in your code assuming it exists. Return ONLY the Python code. Do not include any conversational text."),
             ("user", "Test Functions:\n{functions}")
         ])
         
-        chain = prompt | self.llm
-        
         try:
-            from langchain_core.output_parsers import StrOutputParser
-            result = (chain | StrOutputParser()).invoke({
+            result = self.router.invoke("compose", prompt, {
                 "functions": "\n\n".join(test_codes)
-            })
+            }, cache=self.cache)
             
             # Robust extraction of code block
             cleaned_code = ""
@@ -130,7 +235,11 @@ class SuiteComposer:
 
             # Prepend the dynamic BASE_URL logic
             # We use os.getenv to allow Docker override, defaulting to the host used during generation
-            header = f"# Generated by Axiom Engine\nimport os\nimport pytest\nimport httpx\n\n# Dynamic Host Configuration\nBASE_URL = os.getenv('AXIOM_TARGET_HOST', '{self.target_host}')\n\n"
+            header = f"# Generated by Axiom Engine\nimport os\nimport pytest\nimport httpx\n\n# Dynamic Host Configuration\nBASE_URL = os.getenv('AXIOM_TARGET_HOST', '{self.target_host}')\n" + CLIENT_FIXTURES + "\n"
+            try:
+                cleaned_code, _ = use_pooled_client(cleaned_code)
+            except SyntaxError:
+                pass
             
             # Remove any existing manual imports or BASE_URL definitions from the LLM output to avoid duplicates
             # (Simple string replacement might be risky, but let's assume LLM follows instructions)
@@ -141,7 +250,8 @@ class SuiteComposer:
             
             return header + cleaned_code
         except Exception as e:
+            telemetry.incr("fallbacks", kind="Suite Composition failed")
             print(f"Suite Composition failed: {e}. Returning simple concatenation.")
             # Fallback
-            header = f"# Generated by Axiom Engine (Fallback)\nimport pytest\nimport httpx\nimport os\nBASE_URL = os.getenv('AXIOM_TARGET_HOST', '{self.target_host}')\n"
+            header = f"# Generated by Axiom Engine (Fallback)\nimport pytest\nimport httpx\nimport os\nBASE_URL = os.getenv('AXIOM_TARGET_HOST', '{self.target_host}')\n" + CLIENT_FIXTURES
             return header + "\n\n".join(test_codes)
@@ -1,33 +1,182 @@
-from typing import List
-from .models import Requirement, TestCase
-from .agents import RequirementsAnalyst, SoftwareTester, SuiteComposer
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List
+from .models import Requirement, TestCase, TestScenario
+from .events import EngineEvent
+from .agents import RequirementsAnalyst, SoftwareTester, SuiteComposer, FALLBACK_SCENARIO_PREFIX, is_fallback
+from .manifest import fingerprint
+from .assembler import SuiteAssembler
+from .similarity import find_clusters, parametrize_variants, derive_scenario, alias_test_case
+from . import telemetry
 
 class TestArchitect:
     """
     Orchestrator that pipelines the Requirement -> Scenario -> Code flow.
     """
-    def __init__(self, target_host: str = "http://localhost:8000", api_key: str = None):
+    def __init__(self, target_host: str = "http://localhost:8000", api_key: str = None, concurrency: int = 1, cache=None,
+                 llm_compose: bool = False, batch_size: int = 1, dedupe: bool = True):
         self.target_host = target_host
-        self.analyst = RequirementsAnalyst(api_key=api_key)
-        self.tester = SoftwareTester(target_host=target_host, api_key=api_key)
-        self.composer = SuiteComposer(target_host=target_host, api_key=api_key)
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        # Near-duplicate requirements share one parametrized test instead of one LLM round-trip each
+        self.dedupe = dedupe
+        self.analyst = RequirementsAnalyst(api_key=api_key, cache=cache, batch_size=self.batch_size)
+        self.tester = SoftwareTester(target_host=target_host, api_key=api_key, cache=cache, batch_size=self.batch_size)
+        # Suites are assembled locally with `ast` unless the LLM composer is explicitly requested
+        if llm_compose:
+            self.composer = SuiteComposer(target_host=target_host, api_key=api_key, cache=cache)
+        else:
+            self.composer = SuiteAssembler(target_host=target_host)
 
-    def generate_test_suite(self, requirements: List[Requirement]) -> str:
-        """Generates a full pytest file content from requirements."""
-        
-        test_codes = []
-
-        for req in requirements:
-            # Step 1: Analyze (Req -> Scenario)
-            scenario = self.analyst.analyze(req)
-            
-            # Step 2: Test (Scenario -> Code)
-            test_case = self.tester.write_test(scenario)
-            
-            test_codes.append(test_case.code)
+    def generate_test_case(self, req: Requirement) -> TestCase:
+        """Runs a single requirement through the analyst and tester agents."""
+        # Step 1: Analyze (Req -> Scenario)
+        scenario = self.analyst.analyze(req)
+
+        # Step 2: Test (Scenario -> Code)
+        return self.tester.write_test(scenario)
+
+    @staticmethod
+    def _restore(checkpoint, kind: str, req: Requirement, model):
+        if checkpoint is None:
+            return None
+        data = checkpoint.get(kind, req.id, fingerprint(req))
+        if data is None:
+            return None
+        telemetry.incr("checkpoint.restored", kind=kind)
+        return model.parse_obj(data)
+
+    @staticmethod
+    def _record(checkpoint, kind: str, req: Requirement, item):
+        """Checkpoints `item` unless it is an LLM-failure placeholder, which a resumed run should retry."""
+        placeholder = item.scenario_id.startswith(FALLBACK_SCENARIO_PREFIX) or (kind == "test_case" and is_fallback(item))
+        if checkpoint is not None and not placeholder:
+            checkpoint.put(kind, req.id, item.dict(), fingerprint(req), aliases=[item.scenario_id])
+        return item
+
+    def iter_generate(self, requirements: List[Requirement], checkpoint=None) -> Iterator[EngineEvent]:
+        """
+        Streams generation: yields a SCENARIO event and then a TEST_CASE event for each requirement as
+        soon as it is ready. Work (single requirements, or batches when `batch_size` > 1) runs on up to
+        `concurrency` worker threads, so events arrive in completion order; `event.index` is the
+        requirement's position in `requirements`.
+        With `dedupe`, near-duplicate requirements (see similarity.find_clusters) only send their first
+        member through the agents; its test is parametrized over the others, which get a derived
+        scenario and an alias test case. Variants the test cannot express are generated on their own.
+        With a `checkpoint` store, every scenario and test case is persisted as soon as it is produced,
+        and artifacts already checkpointed for an unchanged requirement are reused instead of regenerated
+        (a requirement whose test case is restored yields only its TEST_CASE event).
+        """
+        requirements = list(requirements)
+        total = len(requirements)
+        if not total:
+            return
+        events: "queue.Queue" = queue.Queue()
+        clusters = find_clusters(requirements) if self.dedupe else [[index] for index in range(total)]
+        variants_of = {cluster[0]: cluster[1:] for cluster in clusters if len(cluster) > 1}
+
+        def emit(kind, index, payload):
+            events.put(EngineEvent(kind, payload, requirement_id=requirements[index].id, index=index, total=total))
 
+        def finish(index, scenario, test_case, fresh):
+            """
+            Emits a canonical requirement's test case, covering its variants when it was just generated.
+            Returns the variants still needing a test of their own.
+            """
+            req = requirements[index]
+            leftovers = variants_of.get(index, [])
+            if fresh:
+                if leftovers and not is_fallback(test_case):
+                    code, covered = parametrize_variants(test_case, req, [requirements[i] for i in leftovers])
+                    if code:
+                        test_case = test_case.copy(update={"code": code})
+                        covered_ids = {variant.id for variant in covered}
+                        telemetry.incr("dedupe.variants", len(covered_ids))
+                        for variant_index in [i for i in leftovers if requirements[i].id in covered_ids]:
+                            variant = requirements[variant_index]
+                            derived = self._record(checkpoint, "scenario", variant, derive_scenario(scenario, req, variant))
+                            emit(EngineEvent.SCENARIO, variant_index, derived)
+                            # Checkpointed before the canonical test, so restoring that implies these too
+                            alias = self._record(checkpoint, "test_case", variant,
+                                                 alias_test_case(test_case, variant, derived.scenario_id))
+                            emit(EngineEvent.TEST_CASE, variant_index, alias)
+                        leftovers = [i for i in leftovers if requirements[i].id not in covered_ids]
+                self._record(checkpoint, "test_case", req, test_case)
+            emit(EngineEvent.TEST_CASE, index, test_case)
+            return leftovers
+
+        def run(indices):
+            try:
+                tests = {index: self._restore(checkpoint, "test_case", requirements[index], TestCase) for index in indices}
+                scenarios = {index: self._restore(checkpoint, "scenario", requirements[index], TestScenario)
+                             for index in indices if tests[index] is None}
+                if self.batch_size > 1:
+                    # Step 1 + 2, several requirements per LLM request
+                    pending = [index for index, scenario in scenarios.items() if scenario is None]
+                    for index, scenario in zip(pending, self.analyst.analyze_many([requirements[i] for i in pending])):
+                        scenarios[index] = self._record(checkpoint, "scenario", requirements[index], scenario)
+                    for index, scenario in scenarios.items():
+                        emit(EngineEvent.SCENARIO, index, scenario)
+                    pending = list(scenarios)
+                    for index, test_case in zip(pending, self.tester.write_tests([scenarios[i] for i in pending])):
+                        tests[index] = test_case
+                    leftovers = []
+                    for index in indices:
+                        leftovers += finish(index, scenarios.get(index), tests[index], fresh=index in scenarios)
+                    if leftovers:
+                        run(leftovers)
+                    return
+                for index in indices:
+                    req = requirements[index]
+                    fresh = tests[index] is None
+                    if fresh:
+                        # Step 1: Analyze (Req -> Scenario)
+                        scenarios[index] = scenarios[index] or self._record(checkpoint, "scenario", req, self.analyst.analyze(req))
+                        emit(EngineEvent.SCENARIO, index, scenarios[index])
+                        # Step 2: Test (Scenario -> Code)
+                        tests[index] = self.tester.write_test(scenarios[index])
+                    leftovers = finish(index, scenarios.get(index), tests[index], fresh)
+                    if leftovers:
+                        run(leftovers)
+            except BaseException as e:
+                events.put(e)
+
+        canonicals = [cluster[0] for cluster in clusters]
+        work = self.analyst.batcher.split(canonicals) if self.batch_size > 1 else [[index] for index in canonicals]
+        pool = ThreadPoolExecutor(max_workers=min(self.concurrency, len(work)))
+        try:
+            for unit in work:
+                pool.submit(telemetry.bind(run), unit)
+            completed = 0
+            while completed < total:
+                event = events.get()
+                if isinstance(event, BaseException):
+                    raise event
+                if event.kind == EngineEvent.TEST_CASE:
+                    completed += 1
+                event.completed = completed
+                yield event
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def generate_test_cases(self, requirements: List[Requirement]) -> List[TestCase]:
+        """
+        Generates one TestCase per requirement, fanned out over at most `concurrency` worker threads.
+        Results are returned in input order regardless of completion order.
+        """
+        test_cases: List[TestCase] = [None] * len(requirements)
+        for event in self.iter_generate(requirements):
+            if event.kind == EngineEvent.TEST_CASE:
+                test_cases[event.index] = event.payload
+        return test_cases
+
+    def compose_suite(self, test_cases: List[TestCase]) -> str:
+        """Assembles already generated test cases into a full pytest file."""
         # Step 3: Compose (Code Blocks -> Full File)
-        # LLM assembles the file with imports
-        full_suite_code = self.composer.compose_suite(test_codes)
+        with telemetry.span("compose", tests=len(test_cases)):
+            # Aliases of a parametrized test carry no code of their own
+            return self.composer.compose_suite([test_case.code for test_case in test_cases if test_case.code])
 
-        return full_suite_code
\ No newline at end of file
+    def generate_test_suite(self, requirements: List[Requirement]) -> str:
+        """Generates a full pytest file content from requirements."""
+        return self.compose_suite(self.generate_test_cases(requirements))
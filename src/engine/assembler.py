@@ -0,0 +1,221 @@
+import ast
+import io
+import sys
+import tokenize
+from typing import Dict, List, Set, Tuple
+from . import telemetry
+from .pooling import CLIENT_FIXTURES, use_pooled_client
+from .validation import normalize_code
+
+# Modules the suite header always imports itself
+HEADER_MODULES = ("os", "pytest", "httpx")
+
+
+def _rename_identifier(source: str, old: str, new: str) -> str:
+    """
+    Renames every NAME token `old` in `source` to `new`, leaving strings, comments, attribute accesses
+    (`response.old`) and keyword arguments (`f(old=...)`) untouched.
+    """
+    lines = source.splitlines(keepends=True)
+    tokens = [tok for tok in tokenize.generate_tokens(io.StringIO(source).readline)
+              if tok.type not in (tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT)]
+    positions = []
+    for position, tok in enumerate(tokens):
+        if tok.type != tokenize.NAME or tok.string != old:
+            continue
+        previous = tokens[position - 1].string if position else ""
+        following = tokens[position + 1].string if position + 1 < len(tokens) else ""
+        if previous == "." or (previous in ("(", ",") and following == "="):
+            continue
+        positions.append(tok.start)
+    for row, col in reversed(positions):
+        line = lines[row - 1]
+        lines[row - 1] = line[:col] + new + line[col + len(old):]
+    return "".join(lines)
+
+
+def _assigned_names(node: ast.stmt) -> List[str]:
+    """Names bound by a module-level `x = ...` / `x: T = ...` (tuple targets included)."""
+    targets = node.targets if isinstance(node, ast.Assign) else [node.target] if isinstance(node, ast.AnnAssign) else []
+    return [child.id for target in targets for child in ast.walk(target)
+            if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Store)]
+
+
+def _is_base_url_assignment(node: ast.stmt) -> bool:
+    targets = node.targets if isinstance(node, ast.Assign) else [node.target] if isinstance(node, ast.AnnAssign) else []
+    return any(isinstance(target, ast.Name) and target.id == "BASE_URL" for target in targets)
+
+
+def _is_main_guard(node: ast.stmt) -> bool:
+    return (isinstance(node, ast.If) and isinstance(node.test, ast.Compare)
+            and isinstance(node.test.left, ast.Name) and node.test.left.id == "__name__")
+
+
+class SuiteAssembler:
+    """
+    Deterministic, local replacement for the LLM SuiteComposer.
+    Parses each generated test function with `ast`, hoists and dedupes their imports, injects the
+    BASE_URL header and the pooled `client` fixtures, rewrites direct `httpx.get(...)`-style calls to the
+    pooled client, renames clashing module-level names (functions, classes, constants, imports) and rejects
+    snippets that do not parse.
+    """
+    def __init__(self, target_host: str):
+        self.target_host = target_host
+
+    def header(self) -> str:
+        return (
+            "# Generated by Axiom Engine\n"
+            "import os\n"
+            "import pytest\n"
+            "import httpx\n"
+        )
+
+    def base_url(self) -> str:
+        return f"# Dynamic Host Configuration\nBASE_URL = os.getenv('AXIOM_TARGET_HOST', '{self.target_host}')\n"
+
+    def fixtures(self) -> str:
+        return CLIENT_FIXTURES
+
+    @staticmethod
+    def _parse(code: str) -> Tuple[str, ast.Module]:
+        code = normalize_code(code)
+        return code, ast.parse(code)
+
+    def compose_suite(self, test_codes: List[str]) -> str:
+        # (snippet index, error message) for every snippet left out; local, so one assembler can be
+        # shared by concurrent runs
+        rejected: List[Tuple[int, str]] = []
+        plain_imports: Set[str] = set()
+        from_imports: Dict[Tuple[str, int], Set[str]] = {}
+        bodies: List[str] = []
+        # Module-level names bound so far: the signature of a def or assignment is its source; an
+        # import's is where it comes from. Snippets binding a taken name to something else get it renamed
+        seen: Dict[str, object] = {name: None for name in ("BASE_URL", "client", "async_client", "axiom_tenant",
+                                                           "TENANT_HEADER", "TENANT_PREFIX", "pytest_asyncio")}
+        seen.update({module: ("import", module) for module in HEADER_MODULES})
+        pooled_calls = 0
+
+        def reject(index: int, error: str):
+            rejected.append((index, error))
+            print(f"Suite assembly: rejected test #{index + 1}: {error}", file=sys.stderr)
+
+        for index, raw_code in enumerate(test_codes):
+            try:
+                code, tree = self._parse(raw_code)
+            except SyntaxError as e:
+                reject(index, f"SyntaxError: {e.msg} (line {e.lineno})")
+                continue
+            code, rewritten = use_pooled_client(code, tree)
+            if rewritten:
+                pooled_calls += rewritten
+                tree = ast.parse(code)
+
+            drop_lines: Set[int] = set()
+            defs = []
+            # (bound name, signature, module key or None for plain imports, imported name, alias)
+            imports = []
+            for node in tree.body:
+                if isinstance(node, ast.Import):
+                    for alias in node.names:
+                        bound = alias.asname or alias.name.split(".")[0]
+                        imports.append((bound, ("import", alias.name if alias.asname else bound), None, alias.name,
+                                        alias.asname))
+                elif isinstance(node, ast.ImportFrom):
+                    key = (node.module or "", node.level)
+                    for alias in node.names:
+                        bound = alias.asname or alias.name
+                        imports.append((bound, ("from",) + key + (alias.name,), key, alias.name, alias.asname))
+                elif _is_base_url_assignment(node) or _is_main_guard(node):
+                    pass
+                else:
+                    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Assign, ast.AnnAssign)):
+                        defs.append(node)
+                    continue
+                start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+                drop_lines.update(range(start, node.end_lineno + 1))
+
+            if not any(isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) for node in defs):
+                reject(index, "no function definition found")
+                continue
+
+            # Resolve name clashes with earlier snippets
+            lines = code.splitlines(keepends=True)
+            taken = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)} | set(seen)
+            bindings: Dict[str, object] = {}
+            renames: Dict[str, str] = {}
+            clash = None
+
+            def fresh(name: str) -> str:
+                suffix = 2
+                while f"{name}_{suffix}" in taken:
+                    suffix += 1
+                taken.add(f"{name}_{suffix}")
+                return f"{name}_{suffix}"
+
+            snippet_imports = []
+            for bound, signature, key, name, asname in imports:
+                if bound == "*" or seen.get(bound, signature) == signature:
+                    bindings.setdefault(bound, signature)
+                    snippet_imports.append((key, name, asname))
+                    continue
+                if key is None and asname is None and "." in name:
+                    # `import a.b` binds `a`; it cannot be re-bound under another name without changing meaning
+                    clash = f"name clash: {bound!r} is already bound in the suite"
+                    break
+                renames[bound] = fresh(bound)
+                bindings[renames[bound]] = signature
+                snippet_imports.append((key, name, renames[bound]))
+
+            for node in defs if clash is None else []:
+                start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+                segment = "".join(lines[start - 1:node.end_lineno])
+                names = [node.name] if hasattr(node, "name") else _assigned_names(node)
+                clashing = [name for name in names if name in seen and name not in renames]
+                if not clashing:
+                    bindings.update({name: segment for name in names})
+                    continue
+                if all(seen[name] == segment for name in clashing) and not any(name.startswith("test") for name in names):
+                    # Identical helper or constant (decorators included) already emitted by an earlier snippet
+                    drop_lines.update(range(start, node.end_lineno + 1))
+                    continue
+                for name in names:
+                    if name in clashing:
+                        renames[name] = fresh(name)
+                    bindings[renames.get(name, name)] = segment
+
+            if clash is not None:
+                reject(index, clash)
+                continue
+
+            body = "".join(line for number, line in enumerate(lines, start=1) if number not in drop_lines).strip("\n")
+            for name, new_name in renames.items():
+                body = _rename_identifier(body + "\n", name, new_name).strip("\n")
+            seen.update(bindings)
+            for key, name, asname in snippet_imports:
+                if key is None:
+                    if name not in HEADER_MODULES or asname:
+                        plain_imports.add(f"import {name}" + (f" as {asname}" if asname else ""))
+                else:
+                    from_imports.setdefault(key, set()).add(name + (f" as {asname}" if asname and asname != name else ""))
+
+            if body:
+                bodies.append(body)
+
+        # __future__ imports must precede every other statement in the file
+        future_names = from_imports.pop(("__future__", 0), set())
+        import_lines = sorted(plain_imports)
+        for (module, level), names in sorted(from_imports.items()):
+            import_lines.append(f"from {'.' * level}{module} import {', '.join(sorted(names))}")
+
+        telemetry.incr("compose.rejected", len(rejected))
+        telemetry.incr("compose.pooled_calls", pooled_calls)
+        suite = f"from __future__ import {', '.join(sorted(future_names))}\n" if future_names else ""
+        suite += self.header()
+        if import_lines:
+            suite += "\n".join(import_lines) + "\n"
+        suite += "\n" + self.base_url()
+        suite += self.fixtures()
+        if rejected:
+            suite += "\n" + "".join(f"# Rejected generated test #{index + 1}: {error}\n" for index, error in rejected)
+        suite += "\n\n" + "\n\n\n".join(bodies) + "\n"
+        return suite
@@ -0,0 +1,162 @@
+"""
+Generates suites for many specs in one invocation.
+
+Usage: python -m src.engine.batch <dir|glob|spec.md>... --output-dir tests/generated [--host URL]
+       [--workers N] [--llm-concurrency N] [--report batch.json]
+
+Specs are processed by a pool of worker threads that share one LLM client, one response cache and one
+process-wide cap on in-flight LLM requests. Each spec gets its own suite (and manifest, so reruns stay
+incremental) named after it, e.g. specs/billing.md -> tests/generated/billing_test.py.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.engine import llm as llm_module, routing
+from src.engine.cache import LLMCache, DEFAULT_CACHE_DIR
+from src.engine.events import EngineEvent
+from src.engine.main import run_engine_stream
+
+
+def find_specs(patterns: List[str]) -> List[str]:
+    """Expands directories (all *.md below them), globs and plain paths; duplicates are dropped."""
+    specs: List[str] = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "**", "*.md"), recursive=True)
+        else:
+            matches = glob.glob(pattern, recursive=True) or ([pattern] if os.path.exists(pattern) else [])
+        for path in sorted(matches):
+            if os.path.isfile(path) and path not in specs:
+                specs.append(path)
+    return specs
+
+
+def output_path_for(spec: str, output_dir: str) -> str:
+    stem = re.sub(r"\W+", "_", os.path.splitext(os.path.basename(spec))[0]).strip("_").lower() or "spec"
+    return os.path.join(output_dir, f"{stem}_test.py")
+
+
+def _counter(report: dict, name: str) -> float:
+    return sum(counter["value"] for counter in report["counters"] if counter["name"] == name)
+
+
+def run_batch(specs: List[str], output_dir: str, target_host: str, api_key: str = None, workers: int = 4,
+              concurrency: int = 4, cache_dir: str = DEFAULT_CACHE_DIR, incremental: bool = True,
+              llm_compose: bool = False, batch_size: int = 1, resume: bool = False,
+              dedupe: bool = True) -> List[dict]:
+    """
+    Runs the engine for every spec on `workers` threads and returns one result per spec (in input order):
+    its output path, status, wall time and run report. A failing spec does not stop the others.
+    """
+    from src.engine.architect import TestArchitect
+    from src.engine.parser import RequirementParser
+
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = [output_path_for(spec, output_dir) for spec in specs]
+    clashes = {output for output in outputs if outputs.count(output) > 1}
+    if clashes:
+        raise ValueError(f"Several specs map to the same output file: {', '.join(sorted(clashes))}")
+
+    # Built once and shared by every worker, together with the LLM client get_llm hands out
+    cache = LLMCache(cache_dir) if cache_dir else None
+    parser = RequirementParser(api_key=api_key, cache=cache, concurrency=concurrency)
+    architect = TestArchitect(target_host=target_host, api_key=api_key, concurrency=concurrency, cache=cache,
+                              llm_compose=llm_compose, batch_size=batch_size, dedupe=dedupe)
+
+    def run(spec: str, output: str) -> dict:
+        start = time.perf_counter()
+        result = {"spec": spec, "output": output, "status": "ok", "error": None, "report": None}
+        try:
+            for event in run_engine_stream(spec, output, target_host, cache_dir=cache_dir, incremental=incremental,
+                                           resume=resume, parser=parser, architect=architect):
+                if event.kind == EngineEvent.DONE:
+                    result["report"] = event.payload
+        except Exception as e:
+            result["status"], result["error"] = "failed", f"{type(e).__name__}: {e}"
+            print(f"{spec}: generation failed: {result['error']}", file=sys.stderr)
+        result["wall_s"] = round(time.perf_counter() - start, 3)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(specs) or 1))) as pool:
+        return list(pool.map(run, specs, outputs))
+
+
+def print_summary(results: List[dict], wall: float):
+    print(f"\n{'spec':<40} {'status':<7} {'reqs':>5} {'generated':>9} {'LLM calls':>9} {'fallbacks':>9} {'wall (s)':>9}")
+    totals = {"requirements": 0, "generated": 0, "calls": 0, "fallbacks": 0}
+    for result in results:
+        report = result["report"] or {"summary": {}, "counters": []}
+        summary = report["summary"]
+        row = {
+            "requirements": summary.get("requirements", 0),
+            "generated": summary.get("added", 0) + summary.get("modified", 0),
+            "calls": int(_counter(report, "llm.calls")),
+            "fallbacks": int(_counter(report, "fallbacks")),
+        }
+        for key, value in row.items():
+            totals[key] += value
+        print(f"{result['spec'][-40:]:<40} {result['status']:<7} {row['requirements']:>5} {row['generated']:>9} "
+              f"{row['calls']:>9} {row['fallbacks']:>9} {result['wall_s']:>9.2f}")
+    failed = sum(1 for result in results if result["status"] != "ok")
+    print(f"\n{len(results)} specs ({failed} failed), {totals['requirements']} requirements, {totals['generated']} generated, "
+          f"{totals['calls']} LLM calls, {totals['fallbacks']} fallbacks in {wall:.2f}s")
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Generate pytest suites for many Markdown specs at once.")
+    arg_parser.add_argument("specs", nargs="+", help="Spec files, directories or glob patterns")
+    arg_parser.add_argument("--output-dir", required=True, help="Directory the generated suites are written to")
+    arg_parser.add_argument("--host", default="http://localhost:8000", help="Target service base URL")
+    arg_parser.add_argument("--workers", type=int, default=4, help="Specs processed in parallel (default: 4)")
+    arg_parser.add_argument("--concurrency", type=int, default=int(os.getenv("AXIOM_CONCURRENCY", "4")),
+                            help="Max requirements generated in parallel per spec (default: $AXIOM_CONCURRENCY or 4)")
+    arg_parser.add_argument("--llm-concurrency", type=int, default=int(os.getenv(llm_module.LLM_CONCURRENCY_ENV, "8")),
+                            help=f"Max in-flight LLM requests across all specs (default: ${llm_module.LLM_CONCURRENCY_ENV} or 8)")
+    arg_parser.add_argument("--cache-dir", default=os.getenv("AXIOM_CACHE_DIR", DEFAULT_CACHE_DIR),
+                            help="Directory for the persistent LLM response cache")
+    arg_parser.add_argument("--no-cache", action="store_true", help="Always call the LLM, bypassing the cache")
+    arg_parser.add_argument("--full", action="store_true", help="Regenerate every requirement, ignoring the manifests")
+    arg_parser.add_argument("--resume", action="store_true", help="Continue interrupted specs from their checkpoints")
+    arg_parser.add_argument("--batch-size", type=int, default=int(os.getenv("AXIOM_BATCH_SIZE", "1")),
+                            help="Requirements per analyst/tester request (default: 1, no batching)")
+    arg_parser.add_argument("--routing", choices=["tiered", "strong", "fast"], default=os.getenv("AXIOM_ROUTING", "tiered"),
+                            help="Model routing: fast model first with escalation (default), or a single tier")
+    arg_parser.add_argument("--no-dedupe", action="store_true",
+                            help="Generate near-duplicate requirements separately instead of as one parametrized test")
+    arg_parser.add_argument("--report", help="Write per-spec results and run reports as JSON to this file")
+    args = arg_parser.parse_args(argv)
+
+    specs = find_specs(args.specs)
+    if not specs:
+        print("No specs found.", file=sys.stderr)
+        return 1
+
+    llm_module.set_llm_concurrency(args.llm_concurrency)
+    routing.set_routing(args.routing)
+    start = time.perf_counter()
+    try:
+        results = run_batch(specs, args.output_dir, args.host, workers=args.workers, concurrency=args.concurrency,
+                            cache_dir=None if args.no_cache else args.cache_dir, incremental=not args.full,
+                            batch_size=args.batch_size, resume=args.resume, dedupe=not args.no_dedupe)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    print_summary(results, time.perf_counter() - start)
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0 if all(result["status"] == "ok" for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
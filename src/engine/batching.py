@@ -0,0 +1,64 @@
+import sys
+import threading
+from typing import Callable, Dict, Hashable, List, TypeVar
+from . import telemetry
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class AdaptiveBatcher:
+    """
+    Packs several items into one LLM request, adapting the batch size to how well the model copes.
+
+    `batch_fn` receives a list of items and returns a dict of key -> result for the items it handled
+    correctly (it may raise, or omit items whose output failed validation). Missing items are split in
+    half and retried; a batch of one goes through `single_fn`, which is expected to have its own fallback.
+    Each failure halves the preferred batch size and each clean batch grows it by one, within bounds.
+    """
+    def __init__(self, batch_size: int = 8, min_size: int = 1, max_size: int = 32):
+        self.min_size = max(1, min_size)
+        self.max_size = max(self.min_size, max_size)
+        self.batch_size = min(max(batch_size, self.min_size), self.max_size)
+        self._lock = threading.Lock()
+
+    def split(self, items: List[T]) -> List[List[T]]:
+        size = self.batch_size
+        return [items[i:i + size] for i in range(0, len(items), size)]
+
+    def _shrink(self):
+        with self._lock:
+            self.batch_size = max(self.min_size, self.batch_size // 2)
+
+    def _grow(self):
+        with self._lock:
+            self.batch_size = min(self.max_size, self.batch_size + 1)
+
+    def run(self, items: List[T], batch_fn: Callable[[List[T]], Dict[Hashable, R]],
+            single_fn: Callable[[T], R], key: Callable[[T], Hashable]) -> List[R]:
+        """Returns one result per item, in input order."""
+        results: Dict[Hashable, R] = {}
+        queue = self.split(items)
+        while queue:
+            batch = queue.pop(0)
+            if len(batch) == 1:
+                results[key(batch[0])] = single_fn(batch[0])
+                continue
+
+            try:
+                handled = batch_fn(batch)
+            except Exception as e:
+                print(f"Batch of {len(batch)} failed: {e}. Splitting and retrying.", file=sys.stderr)
+                handled = {}
+
+            missing = [item for item in batch if key(item) not in handled]
+            results.update({key(item): handled[key(item)] for item in batch if key(item) in handled})
+            if missing:
+                telemetry.incr("batch.splits")
+                self._shrink()
+                half = (len(missing) + 1) // 2
+                queue[:0] = [part for part in (missing[:half], missing[half:]) if part]
+            else:
+                self._grow()
+
+        return [results[key(item)] for item in items]
@@ -0,0 +1,216 @@
+"""
+End-to-end pipeline benchmark on synthetic specs, using the offline stub LLM backend by default.
+
+Usage: python -m src.engine.bench [--sizes 10 100 1000] [--output bench.json] [--baseline old.json] [--imports-only]
+
+Reports wall time, LLM calls, prompt bytes and peak Python memory for every stage, plus the import time of
+each entry point in a fresh interpreter. With `--baseline`, exits non-zero if any stage regressed by more
+than `--max-regression`, and always if an entry point eagerly loads LangChain/OpenAI, so it can gate CI.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.engine import backends
+
+METHODS = [("GET", 200), ("PUT", 200), ("POST", 201), ("DELETE", 204)]
+
+# Modules imported by the CLI and the Streamlit UI before any generation starts
+ENTRY_MODULES = ["src.engine.main", "src.engine.jobs", "src.engine.runner", "src.engine.batch"]
+# Must only be loaded once a run actually starts
+HEAVY_PACKAGES = {"langchain", "langchain_core", "langchain_openai", "openai"}
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+
+def make_spec(num_acs: int) -> str:
+    """Builds a spec in the docs/project_sample.md layout with `num_acs` acceptance criteria."""
+    lines = [
+        f"# Synthetic Resource API ({num_acs} ACs)",
+        "> [Priority: High] [Domain: Benchmark]",
+        "",
+        "## User Story",
+        "**As a** client developer",
+        "**I want** to manage resources over HTTP",
+        "**So that** I can build features on top of them.",
+        "",
+        "## Acceptance Criteria",
+        "",
+    ]
+    for i in range(1, num_acs + 1):
+        method, status = METHODS[i % len(METHODS)]
+        lines += [
+            f"### AC-{i:04d}: {method} resource {i}",
+            "**Given** a valid JWT token in the `Authorization` header",
+            f"**When** a {method} request is made to `/resources/{i}`",
+            f"**Then** the system should return a {status} status",
+            f"**And** the response must reference resource `{i}`.",
+            "",
+        ]
+    lines += [
+        "## Technical Contract (JSON)",
+        "",
+        "### Resource Model",
+        "```json",
+        '{"id": 1, "name": "example", "owner": "user@example.com"}',
+        "```",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def measure(name: str, fn):
+    """Runs `fn` with engine output silenced; returns (result, metrics)."""
+    backends.stats.reset()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        result = fn()
+    wall = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    metrics = {"stage": name, "wall_s": round(wall, 4), "peak_mem_bytes": peak}
+    metrics.update(backends.stats.snapshot())
+    return result, metrics
+
+
+def bench_size(num_acs: int, concurrency: int) -> list:
+    from src.engine.parser import RequirementParser
+    from src.engine.agents import RequirementsAnalyst, SoftwareTester, SuiteComposer
+    from src.engine.assembler import SuiteAssembler
+    from src.engine.architect import TestArchitect
+    from src.engine.main import run_engine
+
+    host = "http://localhost:8000"
+    spec = make_spec(num_acs)
+    results = []
+
+    requirements, metrics = measure("parser", lambda: RequirementParser(concurrency=concurrency).parse(spec))
+    results.append(metrics)
+    _, metrics = measure("parser_llm", lambda: RequirementParser(structural=False, concurrency=concurrency).parse(spec))
+    results.append(metrics)
+
+    analyst = RequirementsAnalyst()
+    scenarios, metrics = measure("analyst", lambda: [analyst.analyze(req) for req in requirements])
+    results.append(metrics)
+
+    tester = SoftwareTester(target_host=host)
+    test_cases, metrics = measure("tester", lambda: [tester.write_test(scenario) for scenario in scenarios])
+    results.append(metrics)
+
+    codes = [test_case.code for test_case in test_cases]
+    _, metrics = measure("composer", lambda: SuiteAssembler(target_host=host).compose_suite(codes))
+    results.append(metrics)
+    _, metrics = measure("composer_llm", lambda: SuiteComposer(target_host=host).compose_suite(codes))
+    results.append(metrics)
+
+    # Synthetic ACs only differ in their values, so dedupe would collapse them into a few parametrized
+    # tests; the main stages measure per-requirement generation and architect_dedupe shows the saving
+    architect = TestArchitect(target_host=host, concurrency=concurrency, dedupe=False)
+    _, metrics = measure("architect", lambda: architect.generate_test_suite(requirements))
+    results.append(metrics)
+    architect = TestArchitect(target_host=host, concurrency=concurrency, dedupe=True)
+    _, metrics = measure("architect_dedupe", lambda: architect.generate_test_suite(requirements))
+    results.append(metrics)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        spec_path = os.path.join(tmp, "spec.md")
+        with open(spec_path, "w") as f:
+            f.write(spec)
+        output = os.path.join(tmp, "generated_suite_test.py")
+        _, metrics = measure("run_engine", lambda: run_engine(spec_path, output, host, concurrency=concurrency,
+                                                              cache_dir=None, incremental=False, dedupe=False))
+        results.append(metrics)
+
+    for metrics in results:
+        metrics["acs"] = num_acs
+    return results
+
+
+def bench_imports(repeat: int = 3) -> list:
+    """Imports each entry module in fresh interpreters; keeps the fastest of `repeat` runs."""
+    results = []
+    for module in ENTRY_MODULES:
+        code = (f"import json, sys, time; start = time.perf_counter(); import {module}; "
+                f"print(json.dumps([time.perf_counter() - start, sorted({{name.split('.')[0] for name in sys.modules}})]))")
+        timings, loaded = [], set()
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+            wall, modules = json.loads(output.stdout.strip().splitlines()[-1])
+            timings.append(wall)
+            loaded.update(modules)
+        results.append({"acs": 0, "stage": f"import {module.rsplit('.', 1)[-1]}", "wall_s": round(min(timings), 4),
+                        "calls": 0, "prompt_bytes": 0, "completion_bytes": 0, "peak_mem_bytes": 0,
+                        "heavy_imports": sorted(loaded & HEAVY_PACKAGES)})
+    return results
+
+
+def find_regressions(current: list, baseline: list, max_regression: float, min_wall_delta: float = 0.05) -> list:
+    previous = {(row["acs"], row["stage"]): row for row in baseline}
+    regressions = []
+    for row in current:
+        old = previous.get((row["acs"], row["stage"]))
+        if old is None:
+            continue
+        for metric in ("calls", "prompt_bytes", "wall_s", "peak_mem_bytes"):
+            limit = old[metric] * (1 + max_regression)
+            if metric == "wall_s":
+                limit = max(limit, old[metric] + min_wall_delta)
+            if row[metric] > limit:
+                regressions.append(f"{row['stage']}@{row['acs']}: {metric} {old[metric]} -> {row[metric]}")
+    return regressions
+
+
+def print_table(rows: list):
+    print(f"{'ACs':>6} {'stage':<16} {'wall (s)':>10} {'calls':>7} {'prompt KB':>11} {'peak MB':>9}")
+    for row in rows:
+        print(f"{row['acs']:>6} {row['stage']:<16} {row['wall_s']:>10.3f} {row['calls']:>7} "
+              f"{row['prompt_bytes'] / 1024:>11.1f} {row['peak_mem_bytes'] / 2 ** 20:>9.2f}")
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Benchmark the Axiom pipeline on synthetic specs.")
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="AC counts to benchmark")
+    arg_parser.add_argument("--concurrency", type=int, default=4)
+    arg_parser.add_argument("--backend", default="stub", help="LLM backend, e.g. stub, stub:0.05 or replay:<file>")
+    arg_parser.add_argument("--output", help="Write results as JSON to this path")
+    arg_parser.add_argument("--baseline", help="Previous --output file to compare against")
+    arg_parser.add_argument("--max-regression", type=float, default=0.25,
+                            help="Allowed relative increase per metric before failing (default: 0.25)")
+    arg_parser.add_argument("--imports-only", action="store_true", help="Only benchmark entry-point import time")
+    args = arg_parser.parse_args(argv)
+
+    os.environ[backends.BACKEND_ENV] = args.backend
+    rows = bench_imports()
+    if not args.imports_only:
+        rows += [row for size in args.sizes for row in bench_size(size, args.concurrency)]
+    print_table(rows)
+
+    eager = [f"{row['stage']}: {', '.join(row['heavy_imports'])}" for row in rows if row.get("heavy_imports")]
+    if eager:
+        print("\nEntry points loading LangChain/OpenAI at import time:\n  " + "\n  ".join(eager))
+        return 1
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = find_regressions(rows, json.load(f), args.max_regression)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
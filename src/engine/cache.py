@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+
+DEFAULT_CACHE_DIR = ".axiom_cache"
+
+
+class LLMCache:
+    """
+    Persistent, content-addressed cache for LLM responses.
+
+    Entries are keyed on (model, temperature, rendered prompt, output schema) and stored as one JSON
+    file per key under `cache_dir`. Eviction is by age (`max_age_seconds`) and count (`max_entries`,
+    least recently used first). Safe to share between threads and processes: writes are atomic renames.
+    """
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_entries: int = 10000,
+                 max_age_seconds: Optional[float] = 30 * 24 * 3600, prune_interval: int = 100):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.prune_interval = prune_interval
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(model: str, temperature, prompt: str, schema: str = "") -> str:
+        payload = json.dumps([model, temperature, prompt, schema], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if self.max_age_seconds is not None and time.time() - entry["created"] > self.max_age_seconds:
+                os.remove(path)
+                raise FileNotFoundError(path)
+            # Touch for LRU ordering
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return entry["value"]
+
+    def put(self, key: str, value: str, model: str = ""):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"model": model, "created": time.time(), "value": value}, f)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self.writes += 1
+            should_prune = self.writes % self.prune_interval == 0
+        if should_prune:
+            self.prune()
+
+    def prune(self):
+        """Drops expired entries, then the least recently used ones beyond `max_entries`."""
+        entries = []
+        now = time.time()
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue
+
+        entries.sort()
+        evict = []
+        if self.max_age_seconds is not None:
+            evict = [path for mtime, path in entries if now - mtime > self.max_age_seconds]
+            entries = [(mtime, path) for mtime, path in entries if now - mtime <= self.max_age_seconds]
+        if self.max_entries is not None and len(entries) > self.max_entries:
+            evict += [path for _, path in entries[:len(entries) - self.max_entries]]
+
+        for path in evict:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+        with self._lock:
+            self.evictions += len(evict)
+
+    def clear(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    os.remove(os.path.join(root, name))
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+from .manifest import fingerprint
+
+if TYPE_CHECKING:
+    from .models import Requirement, TestSuite
+
+
+def checkpoint_path_for(output_test_file: str) -> str:
+    """The checkpoint lives next to the generated suite, e.g. tests/generated_suite_test.checkpoint.jsonl."""
+    return os.path.splitext(output_test_file)[0] + ".checkpoint.jsonl"
+
+
+class CheckpointStore:
+    """
+    Append-only store for intermediate artifacts (parsed requirements, scenarios, test cases) of a run.
+
+    Records are JSON lines in `path`; a small index file next to it (`path` + ".idx") maps
+    "<kind>:<id>" to the record's byte offset and length, so a lookup reads one line instead of the
+    whole file. Each record carries the fingerprint of the input it was derived from and is only
+    returned while that fingerprint still matches. The data file is the source of truth: records the
+    index missed (e.g. after a crash between the two writes) are recovered on open, and a torn last
+    line is dropped.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.index_path = path + ".idx"
+        self._lock = threading.Lock()
+        # "<kind>:<id>" -> (offset, length, fingerprint)
+        self._index: Dict[str, Tuple[int, int, Optional[str]]] = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        indexed_end = 0
+        torn = False
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as f:
+                for line in f:
+                    try:
+                        key, offset, length, fingerprint = json.loads(line)
+                    except ValueError:
+                        # Everything past a torn line is re-derived from the data file below
+                        torn = True
+                        break
+                    self._index[key] = (offset, length, fingerprint)
+                    indexed_end = max(indexed_end, offset + length)
+        if indexed_end > os.path.getsize(self.path):
+            # Index points past the data (e.g. the data file was replaced); rebuild it from scratch
+            self._index, indexed_end = {}, 0
+            os.remove(self.index_path)
+        recovered = self._recover(indexed_end)
+        if torn:
+            # Rewrite the index without the torn line, or every later open would re-append the same entries
+            self._rewrite_index()
+        elif recovered:
+            with open(self.index_path, "a") as index:
+                for key, (offset, length, fingerprint) in recovered.items():
+                    index.write(json.dumps([key, offset, length, fingerprint]) + "\n")
+
+    def _rewrite_index(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as index:
+            for key, (offset, length, fingerprint) in self._index.items():
+                index.write(json.dumps([key, offset, length, fingerprint]) + "\n")
+        os.replace(tmp_path, self.index_path)
+
+    def _recover(self, start: int) -> Dict[str, Tuple[int, int, Optional[str]]]:
+        """
+        Indexes records appended after `start`, truncates a partially written last line and returns the
+        recovered index entries.
+        """
+        with open(self.path, "rb+") as f:
+            f.seek(start)
+            offset = start
+            recovered = []
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                for key in [record["key"]] + record.get("aliases", []):
+                    recovered.append((key, offset, len(line), record.get("fingerprint")))
+                offset += len(line)
+            f.truncate(offset)
+        entries = {}
+        for key, record_offset, length, fingerprint in recovered:
+            entries[key] = self._index[key] = (record_offset, length, fingerprint)
+        return entries
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def put(self, kind: str, item_id: str, data, fingerprint: Optional[str] = None, aliases: Iterable[str] = ()):
+        """Appends a record for `kind`/`item_id`; `aliases` are extra "<kind>:<id>" keys for the same record."""
+        keys = [f"{kind}:{item_id}"] + [f"{kind}:{alias}" for alias in aliases]
+        line = (json.dumps({"key": keys[0], "aliases": keys[1:], "fingerprint": fingerprint, "data": data},
+                           ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            with open(self.path, "ab") as f:
+                offset = f.tell()
+                f.write(line)
+            with open(self.index_path, "a") as index:
+                for key in keys:
+                    self._index[key] = (offset, len(line), fingerprint)
+                    index.write(json.dumps([key, offset, len(line), fingerprint]) + "\n")
+
+    def get(self, kind: str, item_id: str, fingerprint: Optional[str] = None):
+        """The latest data stored for `kind`/`item_id`, or None if missing or recorded for another fingerprint."""
+        with self._lock:
+            entry = self._index.get(f"{kind}:{item_id}")
+            if entry is None or (fingerprint is not None and entry[2] != fingerprint):
+                return None
+            offset, length, _ = entry
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                line = f.read(length)
+        return json.loads(line)["data"]
+
+    def clear(self):
+        with self._lock:
+            self._index = {}
+            for path in (self.path, self.index_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def restore_suite(store: CheckpointStore, requirements: List["Requirement"]) -> "TestSuite":
+    """Everything `store` holds for the current version of `requirements`, as a TestSuite (spec order)."""
+    from .models import TestCase, TestScenario, TestSuite
+    suite = TestSuite(requirements=list(requirements))
+    for req in requirements:
+        scenario = store.get("scenario", req.id, fingerprint(req))
+        if scenario is not None:
+            suite.scenarios.append(TestScenario.parse_obj(scenario))
+        test_case = store.get("test_case", req.id, fingerprint(req))
+        if test_case is not None:
+            suite.tests.append(TestCase.parse_obj(test_case))
+    return suite
@@ -0,0 +1,29 @@
+from typing import Any, Optional
+
+
+class EngineEvent:
+    """
+    A progress notification from a streaming engine run (see run_engine_stream / TestArchitect.iter_generate).
+    `completed` / `total` count finished test cases, so `progress` can drive a progress bar directly.
+    """
+    PARSED = "parsed"          # payload: List[Requirement] to (re)generate
+    SCENARIO = "scenario"      # payload: TestScenario
+    TEST_CASE = "test_case"    # payload: TestCase
+    FLUSHED = "flushed"        # payload: path of the (partial) suite written to disk
+    DONE = "done"              # payload: run report
+
+    def __init__(self, kind: str, payload: Any = None, requirement_id: Optional[str] = None,
+                 index: Optional[int] = None, completed: int = 0, total: int = 0):
+        self.kind = kind
+        self.payload = payload
+        self.requirement_id = requirement_id
+        self.index = index
+        self.completed = completed
+        self.total = total
+
+    @property
+    def progress(self) -> float:
+        return self.completed / self.total if self.total else 1.0
+
+    def __repr__(self):
+        return f"EngineEvent({self.kind!r}, requirement_id={self.requirement_id!r}, {self.completed}/{self.total})"
@@ -0,0 +1,252 @@
+"""
+Test impact selection for generated suites.
+
+Each test is mapped statically (from its AST) to the HTTP endpoints it calls, and from the manifest to
+the requirements it covers. A test's result is stored under a key combining the hash of its code
+with the OpenAPI fingerprint of each endpoint it calls. A later run only re-executes tests whose key
+has no stored result, meaning their code or one of their endpoints changed, and reuses the rest.
+"""
+import ast
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+from .manifest import SuiteManifest, manifest_path_for
+from .pooling import HTTPX_VERBS
+
+# Placeholder for a path segment that is only known at run time (e.g. an f-string expression)
+DYNAMIC = "{}"
+
+# Results are not reused for outcomes that usually mean the run itself went wrong (service down, ...)
+REUSABLE_OUTCOMES = ("passed", "failed", "skipped")
+
+
+def results_path_for(test_file: str) -> str:
+    """Stored results live next to the generated suite, e.g. tests/generated_suite_test.results.json."""
+    return os.path.splitext(test_file)[0] + ".results.json"
+
+
+def _sha(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def _url_template(node: ast.AST, names: Dict[str, ast.AST], depth: int = 0) -> Optional[str]:
+    """The URL an expression evaluates to, with run-time parts replaced by DYNAMIC; None if unknown."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id == "BASE_URL":
+            return ""
+        if node.id in names and depth < 5:
+            return _url_template(names[node.id], names, depth + 1)
+        return None
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.FormattedValue):
+                part = _url_template(value.value, names, depth + 1)
+                parts.append(DYNAMIC if part is None else part)
+            else:
+                parts.append(value.value)
+        return "".join(parts)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        left = _url_template(node.left, names, depth + 1)
+        right = _url_template(node.right, names, depth + 1)
+        return None if left is None and right is None else (left or DYNAMIC) + (right or DYNAMIC)
+    return None
+
+
+def normalize_path(url: str) -> str:
+    """Drops scheme, host and query string, so "http://h/items/1?x=2" becomes "/items/1"."""
+    url = re.sub(r"^[a-z]+://[^/]*", "", url).split("?", 1)[0].split("#", 1)[0]
+    return "/" + url.strip("/")
+
+
+def endpoint_calls(function: ast.AST) -> List[Tuple[str, Optional[str]]]:
+    """
+    (METHOD, path) for every `<anything>.get/post/...(url)` call in `function`, e.g. `client.get(...)`
+    or `httpx.put(...)`. The path is None when the URL cannot be worked out statically.
+    """
+    names: Dict[str, ast.AST] = {}
+    for node in ast.walk(function):
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            names[node.targets[0].id] = node.value
+
+    calls = []
+    for node in ast.walk(function):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr in HTTPX_VERBS):
+            continue
+        args = list(node.args)
+        keywords = {keyword.arg: keyword.value for keyword in node.keywords}
+        if node.func.attr in ("request", "stream"):
+            method_node = args.pop(0) if args else keywords.get("method")
+            if not (isinstance(method_node, ast.Constant) and isinstance(method_node.value, str)):
+                calls.append(("*", None))
+                continue
+            method = method_node.value.upper()
+        else:
+            method = node.func.attr.upper()
+        url_node = args[0] if args else keywords.get("url")
+        url = _url_template(url_node, names) if url_node is not None else None
+        calls.append((method, normalize_path(url) if url is not None else None))
+    return calls
+
+
+def map_tests(test_file: str) -> Dict[str, dict]:
+    """
+    test function name -> {"requirement_ids", "endpoints", "code_hash"} for every top-level test. The
+    code hash covers the test's source and the module-level code around it (imports, fixtures,
+    BASE_URL), so a header change invalidates every test.
+    """
+    with open(test_file, "r") as f:
+        source = f.read()
+    tree = ast.parse(source, filename=test_file)
+    tests = [node for node in tree.body
+             if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith("test")]
+    shared = ast.unparse(ast.Module(body=[node for node in tree.body if node not in tests], type_ignores=[]))
+
+    requirements: Dict[str, List[str]] = {}
+    manifest = SuiteManifest.load(manifest_path_for(test_file))
+    for req_id, entry in manifest.entries.items():
+        # Aliases of a parametrized test are listed as "test_x[AC-0005]"
+        requirements.setdefault(entry["test_function_name"].split("[", 1)[0], []).append(req_id)
+
+    return {
+        node.name: {
+            "requirement_ids": requirements.get(node.name, []),
+            "endpoints": sorted(set(endpoint_calls(node)), key=lambda call: (call[0], call[1] or "")),
+            "code_hash": _sha(shared, ast.get_source_segment(source, node) or ast.unparse(node)),
+        }
+        for node in tests
+    }
+
+
+def load_openapi(source: str, target_host: str = None) -> Optional[dict]:
+    """
+    The target service's OpenAPI schema, from a JSON file, a URL, or an importable "module:app"
+    (e.g. src.mock_service.main:app, without starting the server). By default it is fetched from
+    `<target_host>/openapi.json`. Returns None if the schema cannot be obtained.
+    """
+    try:
+        if source and os.path.exists(source):
+            with open(source, "r") as f:
+                return json.load(f)
+        if source and ":" in source and not re.match(r"^[a-z]+://", source):
+            import importlib
+            module_name, _, attribute = source.partition(":")
+            return getattr(importlib.import_module(module_name), attribute).openapi()
+        url = source or (target_host or os.getenv("AXIOM_TARGET_HOST", "http://localhost:8000")).rstrip("/") + "/openapi.json"
+        import httpx
+        response = httpx.get(url, timeout=5.0)
+        response.raise_for_status()
+        return response.json()
+    except Exception as e:
+        print(f"Could not load the OpenAPI schema from {source or target_host}: {e}. Every test counts as impacted.")
+        return None
+
+
+def normalize_host(target_host: Optional[str]) -> str:
+    """"HTTP://Staging.example.com:8000/" -> "http://staging.example.com:8000"; "" if unset."""
+    if not target_host:
+        return ""
+    match = re.match(r"^([a-zA-Z][a-zA-Z0-9+.\-]*://)?([^/?#]*)(.*)$", target_host.strip())
+    return ((match.group(1) or "").lower() + match.group(2).lower() + match.group(3)).rstrip("/")
+
+
+def _referenced(node, schema: dict, seen: set):
+    """Collects the names of every component reachable through $ref from `node`."""
+    if isinstance(node, dict):
+        ref = node.get("$ref")
+        if isinstance(ref, str) and ref.startswith("#/") and ref not in seen:
+            seen.add(ref)
+            target = schema
+            for part in ref[2:].split("/"):
+                target = target.get(part, {}) if isinstance(target, dict) else {}
+            _referenced(target, schema, seen)
+        for value in node.values():
+            _referenced(value, schema, seen)
+    elif isinstance(node, list):
+        for value in node:
+            _referenced(value, schema, seen)
+
+
+class ServiceFingerprint:
+    """
+    Per-endpoint fingerprints of a service's OpenAPI schema: an operation's hash covers its own
+    definition and every component it references, so changing a request/response model only
+    invalidates the endpoints using it. Calls to paths the schema does not list (or whose URL is not
+    known statically) depend on the whole schema. `version` (e.g. the service's git revision) is mixed
+    into every fingerprint, for behaviour changes the schema does not show. `target_host` is part of every
+    test key, so results recorded against one deployment (staging) are never reused for another (prod).
+    """
+    def __init__(self, schema: Optional[dict], version: str = "", target_host: str = None):
+        self.schema = schema
+        self.version = version or ""
+        self.target_host = normalize_host(target_host)
+        self.whole = _sha(self.version, json.dumps(schema, sort_keys=True)) if schema is not None else None
+        self.operations: Dict[Tuple[str, str], str] = {}
+        for path, item in (schema or {}).get("paths", {}).items():
+            for method, operation in item.items():
+                if not isinstance(operation, dict):
+                    continue
+                refs = set()
+                _referenced(operation, schema, refs)
+                components = {}
+                for ref in sorted(refs):
+                    target = schema
+                    for part in ref[2:].split("/"):
+                        target = target.get(part, {}) if isinstance(target, dict) else {}
+                    components[ref] = target
+                self.operations[(method.upper(), path)] = _sha(
+                    self.version, json.dumps([operation, components, item.get("parameters")], sort_keys=True))
+
+    @staticmethod
+    def _matches(template: str, path: str) -> bool:
+        template_parts, path_parts = template.strip("/").split("/"), path.strip("/").split("/")
+        return len(template_parts) == len(path_parts) and all(
+            left == right or (left.startswith("{") and left.endswith("}")) or DYNAMIC in right
+            for left, right in zip(template_parts, path_parts))
+
+    def endpoint(self, method: str, path: Optional[str]) -> Optional[str]:
+        if self.schema is None:
+            return None
+        if path is not None:
+            for (operation_method, template), digest in self.operations.items():
+                if method in (operation_method, "*") and self._matches(template, path):
+                    return digest
+        return self.whole
+
+    def test_key(self, test: dict) -> Optional[str]:
+        """The cache key for a test mapped by map_tests, or None if the service cannot be fingerprinted."""
+        digests = [self.endpoint(method, path) for method, path in test["endpoints"]] or [self.whole]
+        if any(digest is None for digest in digests):
+            return None
+        return _sha(test["code_hash"], self.target_host, *digests)
+
+
+class ResultStore:
+    """Stored results per test key: {key: {"test": name, "results": [per-test results]}}."""
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            with open(path, "r") as f:
+                self.entries: Dict[str, dict] = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, key: Optional[str]) -> Optional[List[dict]]:
+        entry = self.entries.get(key) if key else None
+        return entry["results"] if entry else None
+
+    def put(self, key: str, name: str, results: List[dict]):
+        if all(result["outcome"] in REUSABLE_OUTCOMES for result in results):
+            self.entries[key] = {"test": name, "results": results}
+
+    def save(self, keep: set):
+        """Writes the store, dropping entries for keys no longer in `keep` (old code or schema versions)."""
+        self.entries = {key: entry for key, entry in self.entries.items() if key in keep}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
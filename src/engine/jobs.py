@@ -0,0 +1,191 @@
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from .cache import LLMCache, DEFAULT_CACHE_DIR
+from .events import EngineEvent
+
+DEFAULT_JOBS_DIR = ".axiom_jobs"
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+INTERRUPTED = "interrupted"
+FINISHED_STATES = (SUCCEEDED, FAILED, INTERRUPTED)
+
+
+class Job:
+    """State of one generation run, persisted as JSON so it survives UI reruns and process restarts."""
+    def __init__(self, job_id: str, spec_file: str, output: str, target_host: str, options: dict = None):
+        self.id = job_id
+        self.spec_file = spec_file
+        self.output = output
+        self.target_host = target_host
+        self.options = options or {}
+        self.status = QUEUED
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.completed = 0
+        self.total = 0
+        # Tests generated so far, in completion order: {"requirement_id", "name", "code"}
+        self.tests: List[dict] = []
+        self.report: Optional[dict] = None
+        self.error: Optional[str] = None
+        # Bumped on every change, so subscribers can wait for something new
+        self.version = 0
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    @property
+    def progress(self) -> float:
+        return self.completed / self.total if self.total else (1.0 if self.done else 0.0)
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Job":
+        job = cls(data["id"], data["spec_file"], data["output"], data["target_host"], data.get("options"))
+        job.__dict__.update(data)
+        return job
+
+
+class JobManager:
+    """
+    Runs generation jobs on a small worker pool, off the caller's thread (e.g. a Streamlit script).
+    Job state is written to `jobs_dir` as it changes. Parsers, architects (and through get_llm, the LLM
+    clients) are built once per configuration and reused by every later job. Jobs for different output
+    files run concurrently; jobs writing the same output file are serialized.
+    """
+    def __init__(self, jobs_dir: str = DEFAULT_JOBS_DIR, workers: int = 2, cache_dir: str = DEFAULT_CACHE_DIR,
+                 save_interval: float = 1.0):
+        self.jobs_dir = jobs_dir
+        self.cache_dir = cache_dir
+        self.cache = LLMCache(cache_dir) if cache_dir else None
+        self.save_interval = save_interval
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="axiom-job")
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._jobs: Dict[str, Job] = {}
+        self._engines: Dict[tuple, object] = {}
+        self._output_locks: Dict[str, threading.Lock] = {}
+        self._saved_at: Dict[str, float] = {}
+        os.makedirs(jobs_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        for name in os.listdir(self.jobs_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.jobs_dir, name), "r") as f:
+                    job = Job.from_dict(json.load(f))
+            except (OSError, ValueError, KeyError):
+                continue
+            if not job.done:
+                # Its worker died with the previous process
+                job.status, job.error = INTERRUPTED, "Process exited before the job finished"
+                self._save(job)
+            self._jobs[job.id] = job
+
+    def _save(self, job: Job):
+        self._saved_at[job.id] = time.monotonic()
+        path = os.path.join(self.jobs_dir, f"{job.id}.json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(job.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    def _update(self, job: Job, throttle: bool = False, **changes):
+        """Applies `changes` and wakes subscribers; with `throttle`, the file is rewritten at most every `save_interval`."""
+        with self._lock:
+            job.__dict__.update(changes)
+            job.version += 1
+            if not throttle or time.monotonic() - self._saved_at.get(job.id, 0) >= self.save_interval:
+                self._save(job)
+            self._changed.notify_all()
+
+    def submit(self, spec_file: str, output: str, target_host: str, api_key: str = None, concurrency: int = 4,
+               incremental: bool = True, llm_compose: bool = False, batch_size: int = 1) -> str:
+        """Queues a generation run and returns its job id immediately."""
+        options = {"concurrency": concurrency, "incremental": incremental, "llm_compose": llm_compose,
+                   "batch_size": batch_size}
+        job = Job(uuid.uuid4().hex[:12], spec_file, output, target_host, options)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._save(job)
+        # The API key is only held in memory, never written to the job file
+        self._pool.submit(self._run, job, api_key)
+        return job.id
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.created, reverse=True)
+
+    def wait(self, job_id: str, since_version: int = -1, timeout: float = None) -> Optional[Job]:
+        """Blocks until the job changes past `since_version` (or finishes, or `timeout` passes)."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._jobs[job_id].version > since_version or self._jobs[job_id].done,
+                                   timeout=timeout)
+            return self._jobs[job_id]
+
+    def _engine(self, kind: str, key: tuple, factory):
+        with self._lock:
+            engine = self._engines.get((kind, key))
+        if engine is not None:
+            return engine
+        # Built outside the lock (it imports LangChain and creates clients) so get/list/wait stay responsive;
+        # if two jobs race, the first instance stored wins
+        engine = factory()
+        with self._lock:
+            return self._engines.setdefault((kind, key), engine)
+
+    def _run(self, job: Job, api_key: str = None):
+        # Deferred so the UI can import this module without loading the agents and LangChain
+        from .architect import TestArchitect
+        from .main import run_engine_stream
+        from .parser import RequirementParser
+
+        with self._lock:
+            output_lock = self._output_locks.setdefault(os.path.abspath(job.output), threading.Lock())
+        with output_lock:
+            self._update(job, status=RUNNING, started=time.time())
+            try:
+                options = job.options
+                parser = self._engine("parser", (api_key, options["concurrency"]), lambda: RequirementParser(
+                    api_key=api_key, cache=self.cache, concurrency=options["concurrency"]))
+                architect = self._engine("architect", (api_key, job.target_host, options["concurrency"],
+                                                       options["llm_compose"], options["batch_size"]), lambda: TestArchitect(
+                    target_host=job.target_host, api_key=api_key, concurrency=options["concurrency"], cache=self.cache,
+                    llm_compose=options["llm_compose"], batch_size=options["batch_size"]))
+
+                for event in run_engine_stream(job.spec_file, job.output, job.target_host, cache_dir=self.cache_dir,
+                                               incremental=options["incremental"], parser=parser, architect=architect):
+                    if event.kind == EngineEvent.PARSED:
+                        self._update(job, total=event.total)
+                    elif event.kind == EngineEvent.TEST_CASE:
+                        test = {"requirement_id": event.requirement_id, "name": event.payload.test_function_name,
+                                "code": event.payload.code}
+                        self._update(job, throttle=True, completed=event.completed, tests=job.tests + [test])
+                    elif event.kind == EngineEvent.DONE:
+                        self._update(job, report=event.payload)
+                self._update(job, status=SUCCEEDED, finished=time.time())
+            except Exception as e:
+                traceback.print_exc(file=sys.stderr)
+                self._update(job, status=FAILED, error=f"{type(e).__name__}: {e}", finished=time.time())
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,154 @@
+import json
+import os
+import random
+import sys
+import threading
+import time
+from .backends import BACKEND_ENV, create_backend, render_messages
+from .markdown import estimate_tokens
+from . import telemetry
+
+# Verbose prompt/response logging; off unless enabled via set_debug (CLI --debug or AXIOM_DEBUG=1)
+DEBUG = os.getenv("AXIOM_DEBUG", "") not in ("", "0", "false")
+
+
+def set_debug(enabled: bool = True):
+    """Turns on verbose logging of every prompt and response (and LangChain's own debug output)."""
+    global DEBUG
+    DEBUG = enabled
+    import langchain
+    langchain.debug = enabled
+
+# Process-wide cap on in-flight LLM requests, shared by every agent, run and batch worker
+LLM_CONCURRENCY_ENV = "AXIOM_LLM_CONCURRENCY"
+_llm_slots = None
+
+
+def set_llm_concurrency(limit: int = None):
+    """Limits concurrent LLM requests across the whole process; `None` or 0 removes the limit."""
+    global _llm_slots
+    _llm_slots = threading.BoundedSemaphore(limit) if limit else None
+
+
+set_llm_concurrency(int(os.getenv(LLM_CONCURRENCY_ENV, "0")))
+
+# Status codes / exception names that signal provider throttling rather than a bad request
+RATE_LIMIT_STATUS_CODES = (429, 503)
+RATE_LIMIT_ERROR_NAMES = ("RateLimitError", "APITimeoutError", "APIConnectionError")
+
+
+def is_rate_limit_error(exc: Exception) -> bool:
+    """Returns True if the exception looks like a transient provider-side throttle."""
+    if type(exc).__name__ in RATE_LIMIT_ERROR_NAMES:
+        return True
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    return status in RATE_LIMIT_STATUS_CODES
+
+
+def invoke_with_backoff(runnable, inputs, max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 30.0):
+    """
+    Invokes a LangChain runnable, retrying with exponential backoff (plus jitter) on rate limits.
+    Any other error is re-raised immediately so the caller's fallback logic still applies.
+    """
+    attempt = 0
+    while True:
+        try:
+            return runnable.invoke(inputs)
+        except Exception as e:
+            if attempt >= max_retries or not is_rate_limit_error(e):
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt)) * (1 + random.random() * 0.25)
+            telemetry.incr("llm.retries", reason=type(e).__name__)
+            print(f"Rate limited ({type(e).__name__}). Retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries}).", file=sys.stderr)
+            time.sleep(delay)
+            attempt += 1
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_llm(api_key: str = None, model: str = "gpt-4-turbo", backend: str = None):
+    """
+    Returns the chat model used by the agents. `backend` (default: $AXIOM_LLM_BACKEND or "openai") can
+    select an offline stub or record/replay backend, see backends.create_backend.
+    Clients are created once per (key, model, backend) and shared by every agent, so repeated runs
+    reuse one client and its HTTP connection pool.
+    """
+    spec = backend or os.getenv(BACKEND_ENV, "openai")
+    client_key = (api_key or os.getenv("OPENAI_API_KEY"), model, spec)
+
+    def openai_llm():
+        from langchain_openai import ChatOpenAI
+        key = api_key or os.getenv("OPENAI_API_KEY")
+        if not key:
+            # Fallback
+            print("WARNING: OPENAI_API_KEY not found. Using dummy LLM.")
+            return ChatOpenAI(model="gpt-3.5-turbo", api_key="sk-dummy")
+        return ChatOpenAI(model=model, temperature=0, api_key=key)
+
+    with _clients_lock:
+        if client_key not in _clients:
+            _clients[client_key] = create_backend(spec, openai_llm, model)
+        return _clients[client_key]
+
+
+def invoke_llm(llm, prompt, inputs: dict, output_parser=None, cache=None):
+    """
+    Renders `prompt` with `inputs`, sends it to `llm` and returns the parsed result (or the raw text if
+    no `output_parser` is given). Responses are served from / written to `cache` when one is provided;
+    only responses that parse successfully are cached.
+    """
+    messages = prompt.format_messages(**inputs)
+    model = getattr(llm, "model_name", type(llm).__name__)
+
+    key = None
+    if cache is not None:
+        schema = ""
+        if output_parser is not None and hasattr(output_parser, "pydantic_object"):
+            schema = json.dumps(output_parser.pydantic_object.schema(), sort_keys=True)
+        key = cache.make_key(model, getattr(llm, "temperature", None), render_messages(messages), schema)
+        cached = cache.get(key)
+        if cached is not None:
+            try:
+                result = output_parser.parse(cached) if output_parser is not None else cached
+                telemetry.incr("cache.hits", model=model)
+                return result
+            except Exception:
+                # Stale entry (e.g. schema drift); fall through and refresh it
+                pass
+        telemetry.incr("cache.misses", model=model)
+
+    rendered = render_messages(messages)
+    if DEBUG:
+        print(f"[axiom:llm] >>> {model}\n{rendered}", file=sys.stderr)
+    slots = _llm_slots
+    if slots is not None:
+        waited = time.perf_counter()
+        slots.acquire()
+        telemetry.incr("llm.slot_wait_s", time.perf_counter() - waited, model=model)
+    try:
+        with telemetry.span("llm_call", model=model):
+            response = invoke_with_backoff(llm, messages)
+    finally:
+        if slots is not None:
+            slots.release()
+    text = response.content
+    if DEBUG:
+        print(f"[axiom:llm] <<< {model}\n{text}", file=sys.stderr)
+
+    # Prefer provider-reported usage; fall back to an estimate when the backend does not report it
+    usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    telemetry.incr("llm.calls", model=model)
+    telemetry.incr("llm.prompt_tokens", usage.get("prompt_tokens") or estimate_tokens(rendered), model=model)
+    telemetry.incr("llm.completion_tokens", usage.get("completion_tokens") or estimate_tokens(text), model=model)
+
+    try:
+        result = output_parser.parse(text) if output_parser is not None else text
+    except Exception:
+        telemetry.incr("llm.parse_errors", model=model)
+        raise
+
+    if cache is not None:
+        cache.put(key, text, model=model)
+    return result
@@ -0,0 +1,262 @@
+"""
+Load mode: replays a generated suite's requests as a throughput benchmark.
+
+Usage: python -m src.engine.loadtest tests/generated_suite_test.py [--host URL]
+       [--concurrency N | --rps R] [--duration S | --iterations N] [--report load.json]
+
+The suite is run once with pytest while every request its tests send through httpx is recorded,
+grouped per test (one "flow" per test or parametrized case). The flows are then replayed on one
+httpx.AsyncClient: closed-loop with `--concurrency` flows in flight, or open-loop, starting `--rps`
+flows per second. A request counts as an error when it raises or its status differs from the one
+seen while recording. Latency percentiles and errors are reported per AC, mapped through the manifest.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.engine.manifest import SuiteManifest, manifest_path_for
+
+# Request headers httpx sets itself; replaying them verbatim would only get in the way
+_SKIPPED_HEADERS = ("host", "content-length", "connection", "accept-encoding", "user-agent")
+
+
+class Flow:
+    """The requests one test (or parametrized case) sent, in order, and the AC it belongs to."""
+    def __init__(self, name: str, requirement_id: str):
+        self.name = name
+        self.requirement_id = requirement_id
+        # {"method", "url", "headers", "content", "status"}
+        self.requests: List[dict] = []
+
+
+class _Recorder:
+    """pytest plugin that attributes every httpx request sent during a test's call phase to that test."""
+    def __init__(self):
+        self.current: Optional[str] = None
+        self.flows: Dict[str, List[dict]] = {}
+
+    def capture(self, request, response):
+        if self.current is None:
+            return
+        self.flows.setdefault(self.current, []).append({
+            "method": request.method,
+            "url": str(request.url),
+            "headers": {key: value for key, value in request.headers.items() if key.lower() not in _SKIPPED_HEADERS},
+            "content": request.content,
+            "status": response.status_code,
+        })
+
+    def pytest_runtest_call(self, item):
+        self.current = item.nodeid.split("::", 1)[-1]
+
+    def pytest_runtest_teardown(self, item):
+        self.current = None
+
+
+def record_flows(test_file: str, target_host: str = None) -> List[Flow]:
+    """Runs `test_file` once in-process and returns the request flow of every test that sent requests."""
+    import httpx
+    import pytest
+
+    recorder = _Recorder()
+    send, async_send = httpx.Client.send, httpx.AsyncClient.send
+
+    def recording_send(client, request, **kwargs):
+        response = send(client, request, **kwargs)
+        recorder.capture(request, response)
+        return response
+
+    async def recording_async_send(client, request, **kwargs):
+        response = await async_send(client, request, **kwargs)
+        recorder.capture(request, response)
+        return response
+
+    previous_host = os.environ.get("AXIOM_TARGET_HOST")
+    if target_host:
+        os.environ["AXIOM_TARGET_HOST"] = target_host
+    httpx.Client.send, httpx.AsyncClient.send = recording_send, recording_async_send
+    try:
+        pytest.main([test_file, "-q", "-p", "no:cacheprovider"], plugins=[recorder])
+    finally:
+        httpx.Client.send, httpx.AsyncClient.send = send, async_send
+        if target_host:
+            if previous_host is None:
+                os.environ.pop("AXIOM_TARGET_HOST", None)
+            else:
+                os.environ["AXIOM_TARGET_HOST"] = previous_host
+
+    requirements: Dict[str, List[str]] = {}
+    for req_id, entry in SuiteManifest.load(manifest_path_for(test_file)).entries.items():
+        requirements.setdefault(entry["test_function_name"].split("[", 1)[0], []).append(req_id)
+
+    flows = []
+    for name, requests in recorder.flows.items():
+        function, _, case = name.partition("[")
+        case = case.rstrip("]")
+        candidates = requirements.get(function, [])
+        # Parametrized variants carry their AC id as the case id (see similarity.py)
+        requirement_id = case if case in candidates else ", ".join(candidates) or name
+        flow = Flow(name, requirement_id)
+        flow.requests = requests
+        flows.append(flow)
+    return flows
+
+
+def record_test_cases(test_cases, target_host: str) -> List[Flow]:
+    """Like record_flows, for TestCase objects that have not been written to a suite yet."""
+    from .assembler import SuiteAssembler
+    suite = SuiteAssembler(target_host=target_host).compose_suite([test_case.code for test_case in test_cases if test_case.code])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "load_suite_test.py")
+        with open(path, "w") as f:
+            f.write(suite)
+        flows = record_flows(path, target_host)
+    names = {test_case.test_function_name.split("[", 1)[0]: test_case.requirement_id for test_case in test_cases}
+    for flow in flows:
+        flow.requirement_id = names.get(flow.name.split("[", 1)[0], flow.requirement_id)
+    return flows
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))]
+
+
+async def _replay(flows: List[Flow], concurrency: int, rps: Optional[float], duration: Optional[float],
+                  iterations: Optional[int]) -> List[tuple]:
+    import httpx
+
+    samples: List[tuple] = []  # (requirement_id, latency_s, ok)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration if duration else None
+    started = 0
+
+    def more() -> bool:
+        if iterations is not None and started >= iterations:
+            return False
+        return deadline is None or loop.time() < deadline
+
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        async def run_flow(flow: Flow):
+            for request in flow.requests:
+                start = time.perf_counter()
+                try:
+                    response = await client.request(request["method"], request["url"], headers=request["headers"],
+                                                    content=request["content"] or None)
+                    ok = response.status_code == request["status"]
+                except httpx.HTTPError:
+                    ok = False
+                samples.append((flow.requirement_id, time.perf_counter() - start, ok))
+
+        if rps:
+            # Open loop: flows start on a fixed schedule; at most `concurrency` are in flight
+            slots = asyncio.Semaphore(concurrency)
+            tasks = []
+            begin = loop.time()
+            while more():
+                await asyncio.sleep(max(0.0, begin + started / rps - loop.time()))
+                await slots.acquire()
+                task = asyncio.ensure_future(run_flow(flows[started % len(flows)]))
+                task.add_done_callback(lambda _: slots.release())
+                tasks.append(task)
+                started += 1
+            await asyncio.gather(*tasks)
+        else:
+            # Closed loop: `concurrency` workers each start the next flow as soon as theirs finishes
+            async def worker():
+                nonlocal started
+                while more():
+                    flow = flows[started % len(flows)]
+                    started += 1
+                    await run_flow(flow)
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+
+def run_load(flows: List[Flow], concurrency: int = 10, rps: float = None, duration: float = None,
+             iterations: int = None) -> dict:
+    """
+    Replays `flows` (round-robin) until `duration` seconds pass or `iterations` flows have started
+    (default: 10 seconds) and returns the report: totals plus p50/p95/p99 latency and errors per AC.
+    """
+    if not flows:
+        raise ValueError("No recorded requests to replay; do the tests reach the target service?")
+    if duration is None and iterations is None:
+        duration = 10.0
+    concurrency = max(1, concurrency)
+    start = time.perf_counter()
+    samples = asyncio.run(_replay(flows, concurrency, rps, duration, iterations))
+    wall = time.perf_counter() - start
+
+    by_requirement: Dict[str, List[tuple]] = {}
+    for requirement_id, latency, ok in samples:
+        by_requirement.setdefault(requirement_id, []).append((latency, ok))
+
+    def summarize(entries: List[tuple]) -> dict:
+        latencies = sorted(latency for latency, _ in entries)
+        errors = sum(1 for _, ok in entries if not ok)
+        return {
+            "requests": len(entries),
+            "errors": errors,
+            "error_rate": round(errors / len(entries), 4) if entries else 0.0,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        }
+
+    return {
+        "mode": f"open loop, {rps} flows/s" if rps else f"closed loop, {concurrency} concurrent",
+        "flows": len(flows),
+        "wall_s": round(wall, 3),
+        "rps": round(len(samples) / wall, 2) if wall else 0.0,
+        **summarize([(latency, ok) for _, latency, ok in samples]),
+        "requirements": {requirement_id: summarize(entries) for requirement_id, entries in sorted(by_requirement.items())},
+    }
+
+
+def print_report(report: dict):
+    print(f"\n{'AC':<24} {'requests':>9} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for requirement_id, row in report["requirements"].items():
+        print(f"{requirement_id[:24]:<24} {row['requests']:>9} {row['errors']:>7} {row['p50_ms']:>8} "
+              f"{row['p95_ms']:>8} {row['p99_ms']:>8}")
+    print(f"\n{report['requests']} requests ({report['errors']} errors) from {report['flows']} flows in {report['wall_s']}s, "
+          f"{report['rps']} req/s, {report['mode']}; p50 {report['p50_ms']}ms, p95 {report['p95_ms']}ms, p99 {report['p99_ms']}ms")
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Replay a generated pytest suite as a load test.")
+    arg_parser.add_argument("test_file", help="Path of the generated pytest file")
+    arg_parser.add_argument("--host", default=None, help="Target service base URL (default: $AXIOM_TARGET_HOST)")
+    arg_parser.add_argument("--concurrency", type=int, default=10,
+                            help="Flows in flight (closed loop), or the cap on in-flight flows with --rps (default: 10)")
+    arg_parser.add_argument("--rps", type=float, default=None, help="Start this many flows per second (open loop)")
+    arg_parser.add_argument("--duration", type=float, default=None, help="Seconds to run (default: 10 unless --iterations)")
+    arg_parser.add_argument("--iterations", type=int, default=None, help="Total flows to start")
+    arg_parser.add_argument("--report", default=None, help="Write the load report as JSON to this path")
+    args = arg_parser.parse_args(argv)
+
+    print("Recording request flows...")
+    flows = record_flows(args.test_file, args.host)
+    print(f"Recorded {sum(len(flow.requests) for flow in flows)} requests in {len(flows)} flows; replaying...")
+    report = run_load(flows, concurrency=args.concurrency, rps=args.rps, duration=args.duration,
+                      iterations=args.iterations)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0 if not report["errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
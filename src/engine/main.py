@@ -1,45 +1,237 @@
 import sys
 import os
+import hashlib
+import time
+from typing import TYPE_CHECKING, Callable, Iterator
 
 # Ensure we can import from src
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
-import langchain
-# Enable verbose debug logging for LangChain
-langchain.debug = True
 
-from src.engine.parser import RequirementParser
-from src.engine.architect import TestArchitect
+# Only light modules are imported here; the parser and agents (and with them LangChain/OpenAI) are
+# loaded when a run actually starts, so importing this module or printing CLI usage stays fast.
+from src.engine.cache import LLMCache, DEFAULT_CACHE_DIR
+from src.engine.manifest import SuiteManifest, manifest_path_for
+from src.engine.checkpoint import CheckpointStore, checkpoint_path_for, restore_suite
+from src.engine.events import EngineEvent
+from src.engine import telemetry
 
-def run_engine(spec_file_path: str, output_test_file: str, target_host: str, api_key: str = None):
+if TYPE_CHECKING:
+    from src.engine.parser import RequirementParser
+    from src.engine.architect import TestArchitect
+
+def run_engine(spec_file_path: str, output_test_file: str, target_host: str, api_key: str = None, concurrency: int = 4,
+               cache_dir: str = DEFAULT_CACHE_DIR, incremental: bool = True,
+               llm_compose: bool = False, batch_size: int = 1, resume: bool = False, dedupe: bool = True,
+               on_event: Callable[[EngineEvent], None] = None) -> dict:
     """
     Reads a spec file, generates a test suite, and writes it to disk.
+    `concurrency` caps how many requirements are sent through the agents in parallel.
+    LLM responses are cached on disk under `cache_dir`; pass `cache_dir=None` to disable caching.
+    With `incremental`, only requirements that were added or changed since the previous run (per the
+    manifest stored next to the output file) go through the agents; the rest reuse their stored tests.
+    The suite is assembled locally; `llm_compose` switches back to the LLM SuiteComposer.
+    `batch_size` > 1 packs that many requirements into each analyst/tester request.
+    With `dedupe`, near-duplicate requirements share one parametrized test (see similarity.py).
+    Parsed requirements, scenarios and test cases are checkpointed next to the output file as they are
+    produced; with `resume`, a run picks up from the checkpoint of an interrupted run instead of paying
+    for those LLM calls again. The checkpoint is removed once a run completes.
+    `on_event`, if given, is called with every EngineEvent of the run (see run_engine_stream).
+
+    Returns a machine-readable run report: per-stage span timings, counters (LLM calls, token
+    estimates, retries, fallbacks, cache hits) and a summary of what was generated.
+    """
+    report = None
+    for event in run_engine_stream(spec_file_path, output_test_file, target_host, api_key=api_key,
+                                   concurrency=concurrency, cache_dir=cache_dir, incremental=incremental,
+                                   llm_compose=llm_compose, batch_size=batch_size, resume=resume, dedupe=dedupe):
+        if on_event is not None:
+            on_event(event)
+        if event.kind == EngineEvent.DONE:
+            report = event.payload
+    return report
+
+def run_engine_stream(spec_file_path: str, output_test_file: str, target_host: str, api_key: str = None,
+                      concurrency: int = 4, cache_dir: str = DEFAULT_CACHE_DIR, incremental: bool = True,
+                      llm_compose: bool = False, batch_size: int = 1, resume: bool = False, dedupe: bool = True,
+                      flush_interval: float = 2.0,
+                      parser: "RequirementParser" = None, architect: "TestArchitect" = None) -> Iterator[EngineEvent]:
+    """
+    Streaming variant of run_engine. Yields a PARSED event, then SCENARIO and TEST_CASE events as each
+    requirement completes, FLUSHED whenever the partial suite is written to `output_test_file` (the first
+    test immediately, then at most every `flush_interval` seconds), and finally DONE with the run report.
+    Long-lived `parser` / `architect` instances may be passed in to be reused across runs; they then
+    take precedence over `api_key`, `concurrency`, `cache_dir`, `llm_compose`, `batch_size` and `dedupe`.
     """
+    tracer = telemetry.Tracer()
+    return telemetry.iterate_with_tracer(tracer, _stream_engine(
+        tracer, spec_file_path, output_test_file, target_host, api_key=api_key, concurrency=concurrency,
+        cache_dir=cache_dir, incremental=incremental, llm_compose=llm_compose, batch_size=batch_size,
+        resume=resume, dedupe=dedupe, flush_interval=flush_interval, parser=parser, architect=architect))
+
+def _write_atomic(path: str, content: str):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def _stream_engine(tracer, spec_file_path, output_test_file, target_host, **options) -> Iterator[EngineEvent]:
+    summary = {}
+    with telemetry.span("run_engine"):
+        yield from _generate(summary, spec_file_path, output_test_file, target_host, **options)
+
+    report = tracer.report()
+    report["summary"] = summary
+    total = summary["added"] + summary["modified"]
+    yield EngineEvent(EngineEvent.DONE, report, completed=total, total=total)
+
+def _generate(summary, spec_file_path, output_test_file, target_host, api_key, concurrency, cache_dir,
+              incremental, llm_compose, batch_size, resume, dedupe, flush_interval, parser, architect) -> Iterator[EngineEvent]:
+    from src.engine.parser import RequirementParser
+    from src.engine.architect import TestArchitect
+    from src.engine.agents import is_fallback
+    from src.engine.models import Requirement
+
     print(f"Reading spec from {spec_file_path}...")
     with open(spec_file_path, "r") as f:
         content = f.read()
 
-    parser = RequirementParser(api_key=api_key)
-    requirements = parser.parse(content)
+    # Injected long-lived parser/architect instances bring their own cache
+    cache = LLMCache(cache_dir) if cache_dir and not (parser and architect) else None
+
+    checkpoint = CheckpointStore(checkpoint_path_for(output_test_file))
+    if not resume:
+        checkpoint.clear()
+    spec_key = hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    with telemetry.span("parse"):
+        parsed = checkpoint.get("requirements", spec_key)
+        if parsed is not None:
+            requirements = [Requirement.parse_obj(req) for req in parsed]
+        else:
+            parser = parser or RequirementParser(api_key=api_key, cache=cache, concurrency=concurrency)
+            requirements = parser.parse(content)
+            checkpoint.put("requirements", spec_key, [req.dict() for req in requirements])
     print(f"Parsed {len(requirements)} requirements.")
 
-    architect = TestArchitect(target_host=target_host, api_key=api_key)
-    test_suite_code = architect.generate_test_suite(requirements)
+    manifest_path = manifest_path_for(output_test_file)
+    manifest = SuiteManifest.load(manifest_path) if incremental else SuiteManifest()
+    if manifest.target_host != target_host:
+        # Generated code may embed the host, so a new target invalidates everything
+        manifest = SuiteManifest(target_host=target_host)
+    diff = manifest.diff(requirements)
+    print(f"Requirements: {diff.summary()}.")
+    restored = restore_suite(checkpoint, diff.changed) if resume else None
+    if restored is not None:
+        print(f"Resuming: {len(restored.tests)} of {len(diff.changed)} test cases "
+              f"(and {len(restored.scenarios)} scenarios) restored from checkpoint.")
+    yield EngineEvent(EngineEvent.PARSED, diff.changed, total=len(diff.changed))
+
+    if not diff.changed and not diff.removed and os.path.exists(output_test_file):
+        print("Spec unchanged since last run; keeping existing test suite.")
+    else:
+        architect = architect or TestArchitect(target_host=target_host, api_key=api_key, concurrency=concurrency,
+                                               cache=cache, llm_compose=llm_compose, batch_size=batch_size,
+                                               dedupe=dedupe)
+        # Spec position of each changed requirement, by object: AC ids are not guaranteed to be unique
+        position = {id(req): index for index, req in enumerate(requirements)}
+        changed_positions = [position[id(req)] for req in diff.changed]
+        pending = set(changed_positions)
+        # Spec order; reused tests are filled in up front, changed ones as they complete
+        test_cases = [None if index in pending else manifest.test_case(req.id) for index, req in enumerate(requirements)]
+
+        last_flush = None
+        with telemetry.span("generate", requirements=len(diff.changed)):
+            for event in architect.iter_generate(diff.changed, checkpoint=checkpoint):
+                yield event
+                if event.kind != EngineEvent.TEST_CASE:
+                    continue
+                test_cases[changed_positions[event.index]] = event.payload
+                # Flush partial results so the first tests are usable long before the run ends
+                done = event.completed == event.total
+                if not done and (last_flush is None or time.monotonic() - last_flush >= flush_interval):
+                    _write_atomic(output_test_file, architect.compose_suite([tc for tc in test_cases if tc is not None]))
+                    last_flush = time.monotonic()
+                    yield EngineEvent(EngineEvent.FLUSHED, output_test_file, completed=event.completed, total=event.total)
+
+        test_suite_code = architect.compose_suite(test_cases)
+
+        print(f"Writing test suite to {output_test_file}...")
+        with telemetry.span("write"):
+            _write_atomic(output_test_file, test_suite_code)
+            manifest.update(requirements, test_cases, is_final=lambda test_case: not is_fallback(test_case))
+            manifest.save(manifest_path)
+        yield EngineEvent(EngineEvent.FLUSHED, output_test_file, completed=len(diff.changed), total=len(diff.changed))
 
-    print(f"Writing test suite to {output_test_file}...")
-    with open(output_test_file, "w") as f:
-        f.write(test_suite_code)
-    
+    # Everything is in the suite and manifest now
+    checkpoint.clear()
+
+    summary.update({
+        "spec": spec_file_path,
+        "output": output_test_file,
+        "requirements": len(requirements),
+        "added": len(diff.added),
+        "modified": len(diff.modified),
+        "removed": len(diff.removed),
+        "unchanged": len(diff.unchanged),
+        "resumed": len(restored.tests) if restored is not None else 0,
+    })
+    if cache_dir:
+        # Counted per run, so the numbers stay meaningful when a cache instance is shared across runs
+        tracer = telemetry.current_tracer()
+        hits, misses = int(tracer.counter("cache.hits")), int(tracer.counter("cache.misses"))
+        summary["cache"] = {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+        print(f"LLM cache: {hits} hits, {misses} misses.")
     print("Done.")
 
+def write_report(report: dict, path: str, metrics_format: str = "json"):
+    """Writes a run_engine report as JSON, or as Prometheus text exposition format."""
+    if metrics_format == "prometheus":
+        text = telemetry.prometheus_text(report)
+    else:
+        import json
+        text = json.dumps(report, indent=2)
+    with open(path, "w") as f:
+        f.write(text)
+
 if __name__ == "__main__":
     # For testing the engine independently
-    # Usage: python src/engine/main.py <spec_path> <output_path> <host>
-    if len(sys.argv) < 3:
-        print("Usage: python main.py <spec_path> <output_path> [host]")
-        sys.exit(1)
-        
-    spec = sys.argv[1]
-    out = sys.argv[2]
-    host = sys.argv[3] if len(sys.argv) > 3 else "http://localhost:8000"
-    
-    run_engine(spec, out, host)
+    # Usage: python src/engine/main.py <spec_path> <output_path> [host] [--concurrency N]
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Generate a pytest suite from a Markdown spec.")
+    arg_parser.add_argument("spec", help="Path to the Markdown specification")
+    arg_parser.add_argument("output", help="Path of the generated pytest file")
+    arg_parser.add_argument("host", nargs="?", default="http://localhost:8000", help="Target service base URL")
+    arg_parser.add_argument("--concurrency", type=int, default=int(os.getenv("AXIOM_CONCURRENCY", "4")),
+                            help="Max requirements generated in parallel (default: $AXIOM_CONCURRENCY or 4)")
+    arg_parser.add_argument("--cache-dir", default=os.getenv("AXIOM_CACHE_DIR", DEFAULT_CACHE_DIR),
+                            help="Directory for the persistent LLM response cache")
+    arg_parser.add_argument("--no-cache", action="store_true", help="Always call the LLM, bypassing the cache")
+    arg_parser.add_argument("--full", action="store_true", help="Regenerate every requirement, ignoring the manifest")
+    arg_parser.add_argument("--resume", action="store_true",
+                            help="Continue an interrupted run from its checkpoint instead of starting over")
+    arg_parser.add_argument("--llm-compose", action="store_true", help="Assemble the suite with the LLM instead of locally")
+    arg_parser.add_argument("--batch-size", type=int, default=int(os.getenv("AXIOM_BATCH_SIZE", "1")),
+                            help="Requirements per analyst/tester request; adapts down on failures (default: 1, no batching)")
+    arg_parser.add_argument("--routing", choices=["tiered", "strong", "fast"], default=os.getenv("AXIOM_ROUTING", "tiered"),
+                            help="Model routing: fast model first with escalation (default), or a single tier")
+    arg_parser.add_argument("--no-dedupe", action="store_true",
+                            help="Generate near-duplicate requirements separately instead of as one parametrized test")
+    arg_parser.add_argument("--report", help="Write the run report (timings, LLM calls, cache hits, fallbacks) to this file")
+    arg_parser.add_argument("--metrics-format", choices=["json", "prometheus"], default="json",
+                            help="Format of the --report file (default: json)")
+    arg_parser.add_argument("--debug", action="store_true", help="Log every prompt/response (same as AXIOM_DEBUG=1)")
+    args = arg_parser.parse_args()
+
+    if args.debug:
+        from src.engine.llm import set_debug
+        set_debug(True)
+    from src.engine.routing import set_routing
+    set_routing(args.routing)
+
+    report = run_engine(args.spec, args.output, args.host, concurrency=args.concurrency,
+                        cache_dir=None if args.no_cache else args.cache_dir, incremental=not args.full,
+                        llm_compose=args.llm_compose, batch_size=args.batch_size, resume=args.resume,
+                        dedupe=not args.no_dedupe)
+    if args.report:
+        write_report(report, args.report, args.metrics_format)
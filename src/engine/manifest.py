@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    # models pulls in pydantic via langchain_core; only needed once a TestCase is built
+    from .models import Requirement, TestCase
+
+MANIFEST_VERSION = 1
+
+
+def manifest_path_for(output_test_file: str) -> str:
+    """The manifest lives next to the generated suite, e.g. tests/generated_suite_test.manifest.json."""
+    return os.path.splitext(output_test_file)[0] + ".manifest.json"
+
+
+def fingerprint(req: "Requirement") -> str:
+    """Stable content hash of everything in a requirement that influences its generated test."""
+    payload = json.dumps([req.id, req.title, req.description, req.priority], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ManifestDiff:
+    """Result of comparing freshly parsed requirements against a manifest."""
+    def __init__(self, added: List["Requirement"], modified: List["Requirement"],
+                 unchanged: List["Requirement"], removed: List[str]):
+        self.added = added
+        self.modified = modified
+        self.unchanged = unchanged
+        self.removed = removed
+
+    @property
+    def changed(self) -> List["Requirement"]:
+        return self.added + self.modified
+
+    def summary(self) -> str:
+        return (f"{len(self.added)} added, {len(self.modified)} modified, "
+                f"{len(self.removed)} removed, {len(self.unchanged)} unchanged")
+
+
+class SuiteManifest:
+    """
+    Per-requirement fingerprints and generated tests for one output suite.
+    Lets `run_engine` regenerate only the requirements whose text changed since the last run.
+    """
+    def __init__(self, target_host: Optional[str] = None, entries: Optional[Dict[str, dict]] = None):
+        self.target_host = target_host
+        # requirement id -> {"fingerprint", "scenario_id", "test_function_name", "code", "description", "alias_of"}
+        self.entries = entries or {}
+
+    @classmethod
+    def load(cls, path: str) -> "SuiteManifest":
+        """Loads a manifest, returning an empty one if it is missing, unreadable or from another version."""
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if data.get("version") != MANIFEST_VERSION:
+            return cls()
+        return cls(target_host=data.get("target_host"),
+                   entries={entry["requirement_id"]: entry for entry in data.get("requirements", [])})
+
+    def save(self, path: str):
+        data = {
+            "version": MANIFEST_VERSION,
+            "target_host": self.target_host,
+            "requirements": list(self.entries.values()),
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def diff(self, requirements: List["Requirement"]) -> ManifestDiff:
+        added, modified, unchanged = [], [], []
+        for req in requirements:
+            entry = self.entries.get(req.id)
+            if entry is None:
+                added.append(req)
+            elif entry.get("fingerprint") != fingerprint(req):
+                modified.append(req)
+            else:
+                unchanged.append(req)
+        current_ids = {req.id for req in requirements}
+        removed = [req_id for req_id in self.entries if req_id not in current_ids]
+        # A parametrized test covers its aliases too: if any member of such a group changed or went
+        # away, the whole group is regenerated so the parameter list stays in step with the spec
+        stale_groups = {self._group(req.id) for req in modified} | {self._group(req_id) for req_id in removed}
+        stale = [req for req in unchanged if self._group(req.id) in stale_groups]
+        if stale:
+            stale_ids = {req.id for req in modified + stale}
+            modified = [req for req in requirements if req.id in stale_ids]
+            unchanged = [req for req in unchanged if req.id not in stale_ids]
+        return ManifestDiff(added, modified, unchanged, removed)
+
+    def _group(self, req_id: str) -> str:
+        """The requirement whose test covers `req_id`: its canonical if it is an alias, else itself."""
+        return self.entries.get(req_id, {}).get("alias_of") or req_id
+
+    def test_case(self, req_id: str) -> "TestCase":
+        from .models import TestCase
+        entry = self.entries[req_id]
+        return TestCase(
+            requirement_id=req_id,
+            scenario_id=entry["scenario_id"],
+            test_function_name=entry["test_function_name"],
+            code=entry["code"],
+            description=entry.get("description", ""),
+        )
+
+    def update(self, requirements: List["Requirement"], test_cases: List["TestCase"], is_final=lambda tc: True):
+        """
+        Replaces the manifest contents with the given (requirement, test case) pairs, in spec order.
+        Test cases rejected by `is_final` (e.g. LLM fallbacks) are stored without a fingerprint so
+        the next incremental run retries them.
+        """
+        from .similarity import alias_of
+        self.entries = {}
+        for req, test_case in zip(requirements, test_cases):
+            self.entries[req.id] = {
+                "requirement_id": req.id,
+                "fingerprint": fingerprint(req) if is_final(test_case) else None,
+                "scenario_id": test_case.scenario_id,
+                "test_function_name": test_case.test_function_name,
+                "code": test_case.code,
+                "description": test_case.description,
+                "alias_of": alias_of(test_case),
+            }
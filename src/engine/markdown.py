@@ -0,0 +1,126 @@
+import re
+from typing import Callable, Iterable, Iterator, List, Optional
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+FENCE_RE = re.compile(r"^\s*(```|~~~)")
+
+
+class Section:
+    """A Markdown heading and the lines up to the next heading of any level."""
+    def __init__(self, level: int, heading: str, start_line: int, parent: Optional["Section"] = None):
+        self.level = level
+        self.heading = heading
+        self.start_line = start_line
+        self.parent = parent
+        self.lines: List[str] = []
+
+    @property
+    def body(self) -> str:
+        return "\n".join(self.lines).strip()
+
+    @property
+    def path(self) -> List[str]:
+        """Headings from the top-level ancestor down to this section."""
+        node, headings = self, []
+        while node is not None:
+            headings.append(node.heading)
+            node = node.parent
+        return list(reversed(headings))
+
+    def text(self) -> str:
+        """The section re-rendered as Markdown (heading + body)."""
+        heading = f"{'#' * self.level} {self.heading}\n" if self.level else ""
+        return heading + self.body
+
+
+def iter_sections(markdown_content: str) -> Iterator[Section]:
+    """
+    Single pass over the document, yielding each section as soon as the next heading starts.
+    Content before the first heading is yielded as a level-0 section. Lines inside fenced code
+    blocks are never treated as headings.
+    """
+    current = Section(0, "", 0)
+    stack: List[Section] = []
+    in_fence = False
+
+    for number, line in enumerate(markdown_content.splitlines(), start=1):
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else HEADING_RE.match(line)
+        if match is None:
+            current.lines.append(line)
+            continue
+
+        if current.level or current.body:
+            yield current
+        level = len(match.group(1))
+        while stack and stack[-1].level >= level:
+            stack.pop()
+        current = Section(level, match.group(2), number, parent=stack[-1] if stack else None)
+        stack.append(current)
+
+    if current.level or current.body:
+        yield current
+
+
+def fold_subsections(sections: Iterable[Section], absorbs: Callable[[Section], bool]) -> Iterator[Section]:
+    """
+    Folds the sections nested under one that `absorbs` (e.g. `#### Examples` under `### AC-07`) into that
+    section's body, heading included, so the enclosing section is yielded whole.
+    """
+    owner = None
+    for section in sections:
+        if owner is not None:
+            if section.level > owner.level:
+                owner.lines.extend(["", *section.text().splitlines()])
+                continue
+            yield owner
+            owner = None
+        if absorbs(section):
+            owner = section
+        else:
+            yield section
+    if owner is not None:
+        yield owner
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English prose and code)."""
+    return len(text) // 4 + 1
+
+
+def pack_chunks(sections: List[Section], max_tokens: int) -> List[str]:
+    """
+    Greedily packs whole sections into chunks of at most `max_tokens` (estimated), so chunks always
+    break at heading boundaries. A single section over budget is split at blank lines instead.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            chunks.append("\n\n".join(current))
+        current, current_tokens = [], 0
+
+    for section in sections:
+        text = section.text()
+        tokens = estimate_tokens(text)
+        if tokens > max_tokens:
+            flush()
+            paragraphs = re.split(r"\n\s*\n", text)
+            for paragraph in paragraphs:
+                paragraph_tokens = estimate_tokens(paragraph)
+                if current and current_tokens + paragraph_tokens > max_tokens:
+                    flush()
+                current.append(paragraph)
+                current_tokens += paragraph_tokens
+            flush()
+            continue
+        if current and current_tokens + tokens > max_tokens:
+            flush()
+        current.append(text)
+        current_tokens += tokens
+    flush()
+    return chunks
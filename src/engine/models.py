@@ -28,6 +28,10 @@ class TestScenario(BaseModel):
     expected_result: str
     test_data: Optional[dict] = Field(None, description="Data needed for the test (payloads, headers)")
 
+class TestScenarioList(BaseModel):
+    """Wrapper for a list of scenarios, used when the analyst handles several requirements per request."""
+    scenarios: List[TestScenario]
+
 class TestCase(BaseModel):
     """Represents a generated Pytest case. Generated by Software Tester Agent."""
     requirement_id: str
@@ -36,6 +40,10 @@ class TestCase(BaseModel):
     code: str = Field(..., description="The full Python code for the test function")
     description: str = Field(..., description="Docstring content explaining the test")
 
+class TestCaseList(BaseModel):
+    """Wrapper for a list of test cases, used when the tester handles several scenarios per request."""
+    tests: List[TestCase]
+
 class TestSuite(BaseModel):
     """Collection of requirements and generated tests."""
     requirements: List[Requirement] = []
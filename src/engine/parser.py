@@ -1,69 +1,187 @@
-import os
 import re
-from typing import List
-from .models import Requirement
-from langchain_openai import ChatOpenAI
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+from .models import Requirement, RequirementList
+from .markdown import Section, fold_subsections, iter_sections, estimate_tokens, pack_chunks
+from .routing import ModelRouter
+from . import telemetry
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 
+AC_HEADING_RE = re.compile(r"^(AC-[\w-]+)\s*[:.\-\u2013\u2014]\s*(.+)$")
+GHERKIN_RE = re.compile(r"^[\s>*_-]*(Given|When|Then)\b", re.IGNORECASE | re.MULTILINE)
+PRIORITY_RE = re.compile(r"\[Priority:\s*([^\]]+)\]", re.IGNORECASE)
+
+
+def iter_ac_sections(markdown_content: str):
+    """iter_sections, with headings nested under an `AC-xx: Title` heading folded into that AC's body."""
+    return fold_subsections(iter_sections(markdown_content), lambda section: bool(AC_HEADING_RE.match(section.heading)))
+
+
+def parse_sections(markdown_content: str) -> Tuple[List[Requirement], List[Section]]:
+    """
+    Single-pass structural parse. Returns the requirements extracted from `AC-xx: Title` headings, and
+    the sections that read like acceptance criteria (Given/When/Then steps, or nested under an
+    "Acceptance Criteria" heading) but have no AC id, which need the LLM to classify.
+    """
+    requirements = []
+    unclassified = []
+    for section in iter_ac_sections(markdown_content):
+        match = AC_HEADING_RE.match(section.heading)
+        if match:
+            priority = PRIORITY_RE.search(section.heading) or PRIORITY_RE.search(section.body)
+            requirements.append(Requirement(
+                id=match.group(1).strip(),
+                title=PRIORITY_RE.sub("", match.group(2)).strip(),
+                description=section.body,
+                priority=priority.group(1).strip() if priority else "Normal",
+            ))
+            continue
+
+        under_ac_heading = any("acceptance criteria" in heading.lower() for heading in section.path[:-1])
+        if section.body and (under_ac_heading or GHERKIN_RE.search(section.body)):
+            unclassified.append(section)
+    return requirements, unclassified
+
+
+def is_shared_context(section: Section, is_title: bool = False) -> bool:
+    """
+    Sections every chunk needs to interpret its ACs: the title/preamble, the user story and the
+    technical contract. A section that reads like a requirement is never shared context, so it always
+    reaches a chunk.
+    """
+    if AC_HEADING_RE.match(section.heading) or GHERKIN_RE.search(section.body):
+        return False
+    if section.level == 0 or is_title:
+        return True
+    return any("user story" in heading.lower() or "contract" in heading.lower() for heading in section.path)
+
+
+def split_shared_context(markdown_content: str) -> Tuple[List[Section], List[Section]]:
+    """(shared context sections, sections to chunk); the document's first heading counts as its title if it is `#`."""
+    sections = list(iter_ac_sections(markdown_content))
+    title = next((section for section in sections if section.level), None)
+    shared = [section for section in sections
+              if is_shared_context(section, is_title=section is title and section.level == 1)]
+    shared_ids = {id(section) for section in shared}
+    return shared, [section for section in sections if id(section) not in shared_ids]
+
+
+def dedupe_requirements(requirements: List[Requirement]) -> List[Requirement]:
+    """Keeps the first requirement seen for each id, preserving document order."""
+    seen = set()
+    unique = []
+    for req in requirements:
+        if req.id not in seen:
+            seen.add(req.id)
+            unique.append(req)
+    return unique
+
+
 class RequirementParser:
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, cache=None, structural: bool = True,
+                 max_chunk_tokens: int = 6000, concurrency: int = 4):
         self.api_key = api_key
-        # Check for API Key or use fallback mock logic if needed (handled in get_llm in agents.py ideally, 
-        # but here we instantiate directly).
-        if not api_key:
-             api_key = os.getenv("OPENAI_API_KEY")
-        
-        if not api_key:
-             print("WARNING: OPENAI_API_KEY not found. Parser might fail if not using fallback.")
-             self.llm = ChatOpenAI(model="gpt-3.5-turbo", api_key="sk-dummy")
-        else:
-             self.llm = ChatOpenAI(model="gpt-4-turbo", temperature=0, api_key=api_key)
+        self.cache = cache
+        self.structural = structural
+        # Specs larger than this (estimated tokens) are split at headings and parsed in parallel
+        self.max_chunk_tokens = max_chunk_tokens
+        self.concurrency = max(1, concurrency)
+        # Extraction is simple: the fast model handles it unless its answer does not parse
+        self.router = ModelRouter(api_key)
 
     def parse(self, markdown_content: str) -> List[Requirement]:
-        """Parses markdown content into structured Requirement objects using an LLM."""
-        
-        # Define the output parser
-        parser = PydanticOutputParser(pydantic_object=Requirement)
-        
-        # We need a list of requirements, so we wrap the prompt to ask for a list
-        # Note: PydanticOutputParser typically parses a single object. 
-        # For a list, we can define a wrapper model or just ask for a list in JSON.
-        # Simpler approach for this demo: Ask for a JSON list of objects matching the schema.
-        
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are an expert Business Analyst. Extract all functional requirements and acceptance criteria from the provided markdown text. Return them as a JSON list where each item matches the following schema: {format_instructions}"),
-            ("user", "Markdown Specification:\n{content}")
-        ])
-        
-        # Wrapper model to parse a list
-        from .models import RequirementList
+        """
+        Parses markdown content into structured Requirement objects.
+        Well-formed `### AC-xx: Title` sections are extracted locally in a single pass; the LLM is only
+        called for sections that look like requirements but cannot be classified structurally, or for
+        the whole document if no structured ACs are found.
+        """
+        if not self.structural:
+            return self._parse_with_fallback(markdown_content)
 
-        list_parser = PydanticOutputParser(pydantic_object=RequirementList)
+        requirements, unclassified = parse_sections(markdown_content)
+        telemetry.incr("parser.structural_acs", len(requirements))
+        if not requirements:
+            return self._parse_with_fallback(markdown_content)
+        if not unclassified:
+            return requirements
 
-        chain = prompt | self.llm | list_parser
-        
+        print(f"Parsed {len(requirements)} ACs structurally; sending {len(unclassified)} unclassified section(s) to the LLM.")
         try:
-            result = chain.invoke({
-                "content": markdown_content,
-                "format_instructions": list_parser.get_format_instructions()
-            })
-            return result.requirements
-            
+            extra = self._llm_parse("\n\n".join(section.text() for section in unclassified),
+                                    context=self._shared_context(markdown_content))
         except Exception as e:
+            telemetry.incr("fallbacks", kind="parser_unclassified")
+            print(f"LLM Parsing of unclassified sections failed: {e}. Keeping structured ACs only.")
+            return requirements
+
+        return dedupe_requirements(requirements + extra)
+
+    def _parse_with_fallback(self, markdown_content: str) -> List[Requirement]:
+        try:
+            return self._llm_parse(markdown_content)
+        except Exception as e:
+            telemetry.incr("fallbacks", kind="parser_regex")
             print(f"LLM Parsing failed: {e}. Falling back to Regex.")
             return self._regex_fallback(markdown_content)
 
+    def _shared_context(self, markdown_content: str, shared: List[Section] = None) -> str:
+        if shared is None:
+            shared, _ = split_shared_context(markdown_content)
+        context = "\n\n".join(section.text() for section in shared)
+        # Never let the shared context eat more than a third of each chunk's budget
+        return context[:self.max_chunk_tokens * 4 // 3]
+
+    def _llm_parse(self, markdown_content: str, context: str = None) -> List[Requirement]:
+        """
+        Extracts requirements from markdown text using the LLM. Raises on failure.
+        Documents over `max_chunk_tokens` are split at heading boundaries into chunks that each carry the
+        shared context (user story, JSON contracts), parsed concurrently and merged by requirement id.
+        """
+        if estimate_tokens(markdown_content) <= self.max_chunk_tokens:
+            return self._llm_parse_chunk(markdown_content, context or "")
+
+        shared, sections = split_shared_context(markdown_content)
+        if context is None:
+            context = self._shared_context(markdown_content, shared)
+        chunks = pack_chunks(sections, max(500, self.max_chunk_tokens - estimate_tokens(context)))
+        if not chunks:
+            # Nothing outside the shared context: there are no requirement sections to send
+            return self._regex_fallback(markdown_content)
+        print(f"Spec exceeds {self.max_chunk_tokens} tokens; parsing {len(chunks)} chunks concurrently.")
+        telemetry.incr("parser.chunks", len(chunks))
+
+        def parse_chunk(chunk: str) -> List[Requirement]:
+            try:
+                return self._llm_parse_chunk(chunk, context)
+            except Exception as e:
+                telemetry.incr("fallbacks", kind="parser_chunk_regex")
+                print(f"LLM Parsing of chunk failed: {e}. Falling back to Regex for that chunk.")
+                return self._regex_fallback(chunk)
+
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(chunks))) as pool:
+            results = list(pool.map(telemetry.bind(parse_chunk), chunks))
+        return dedupe_requirements([req for chunk_requirements in results for req in chunk_requirements])
+
+    def _llm_parse_chunk(self, markdown_content: str, context: str) -> List[Requirement]:
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", "You are an expert Business Analyst. Extract all functional requirements and acceptance criteria from the provided markdown text. Return them as a JSON list where each item matches the following schema: {format_instructions}"),
+            ("user", "{context}Markdown Specification:\n{content}")
+        ])
+
+        # Wrapper model to parse a list
+        list_parser = PydanticOutputParser(pydantic_object=RequirementList)
+
+        result = self.router.invoke("parse", prompt, {
+            "context": f"Shared context (reference only, do not extract requirements from it):\n{context}\n\n" if context else "",
+            "content": markdown_content,
+            "format_instructions": list_parser.get_format_instructions()
+        }, output_parser=list_parser, cache=self.cache,
+            check=lambda result: None if result.requirements else "empty: no requirements extracted")
+        return result.requirements
+
     def _regex_fallback(self, markdown_content: str) -> List[Requirement]:
-        """Fallback regex parser."""
-        requirements = []
-        pattern = re.compile(r'###\s+(AC-[\d\w]+):\s+(.*?)\n(.*?)(?=\n###|\Z)', re.DOTALL)
-        matches = pattern.findall(markdown_content)
-        for match in matches:
-            req_id, title, body = match
-            requirements.append(Requirement(
-                id=req_id.strip(),
-                title=title.strip(),
-                description=body.strip()
-            ))
+        """Fallback parser: every `### AC-xx: Title` section, without an LLM."""
+        requirements, _ = parse_sections(markdown_content)
         return requirements
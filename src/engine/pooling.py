@@ -0,0 +1,96 @@
+import ast
+from typing import List, Tuple
+
+# Module-level httpx helpers that open a fresh connection per call
+HTTPX_VERBS = ("get", "post", "put", "patch", "delete", "head", "options", "request", "stream")
+
+# Keyword arguments the module-level helpers accept but httpx.Client methods do not (they configure the client)
+CLIENT_ONLY_KWARGS = ("verify", "cert", "proxy", "proxies", "trust_env")
+
+CLIENT_FIXTURE = "client"
+
+# Appended to every suite header, after BASE_URL is defined
+CLIENT_FIXTURES = '''
+# Shared, keep-alive HTTP clients: one connection pool per session instead of one connection per request
+@pytest.fixture(scope="session")
+def client():
+    with httpx.Client(base_url=BASE_URL, timeout=30.0) as session_client:
+        yield session_client
+
+
+# Each test runs as its own tenant on services that scope state by this header (e.g. the mock
+# service), so parallel shards and reruns do not see each other's writes
+TENANT_HEADER = "X-Axiom-Tenant"
+TENANT_PREFIX = os.getenv("AXIOM_TENANT") or os.urandom(6).hex()
+
+
+@pytest.fixture(autouse=True)
+def axiom_tenant(request, client):
+    # The session client is shared, so every test starts without the cookies and headers earlier tests left
+    # behind (assigning headers resets them to httpx's defaults)
+    client.cookies.clear()
+    client.headers = {TENANT_HEADER: f"{TENANT_PREFIX}-{request.node.name}"}
+    yield client.headers[TENANT_HEADER]
+
+
+try:
+    import pytest_asyncio
+except ImportError:  # pragma: no cover - async tests need pytest-asyncio
+    pytest_asyncio = None
+
+if pytest_asyncio is not None:
+    @pytest_asyncio.fixture
+    async def async_client(axiom_tenant):
+        async with httpx.AsyncClient(base_url=BASE_URL, timeout=30.0, headers={TENANT_HEADER: axiom_tenant}) as session_client:
+            yield session_client
+'''
+
+
+def _binds_name(node: ast.AST, name: str) -> bool:
+    return any(isinstance(child, ast.Name) and child.id == name and isinstance(child.ctx, ast.Store)
+               for child in ast.walk(node))
+
+
+def _char_column(line: str, byte_offset: int) -> int:
+    """ast column offsets count UTF-8 bytes; string slicing needs characters."""
+    return len(line.encode("utf-8")[:byte_offset].decode("utf-8"))
+
+
+def use_pooled_client(code: str, tree: ast.Module = None) -> Tuple[str, int]:
+    """
+    Rewrites `httpx.get(...)`-style calls in top-level sync test functions to use the session `client`
+    fixture, adding it as a parameter where needed. Functions that bind their own `client` are left
+    alone, and so are calls passing client-only settings such as `verify=False`. Returns the new code and the number of calls rewritten.
+    """
+    tree = tree or ast.parse(code)
+    lines = code.splitlines(keepends=True)
+    # (line, column, old text, new text), applied bottom-up so earlier offsets stay valid
+    edits: List[Tuple[int, int, str, str]] = []
+
+    for node in tree.body:
+        if not isinstance(node, ast.FunctionDef) or not node.name.startswith("test"):
+            continue
+        params = [arg.arg for arg in node.args.posonlyargs + node.args.args + node.args.kwonlyargs]
+        if CLIENT_FIXTURE not in params and _binds_name(node, CLIENT_FIXTURE):
+            continue
+        # Calls passing client-level settings (or **kwargs that might hold them) keep their own connection
+        calls = [child.func.value for child in ast.walk(node)
+                 if isinstance(child, ast.Call) and isinstance(child.func, ast.Attribute)
+                 and child.func.attr in HTTPX_VERBS and isinstance(child.func.value, ast.Name)
+                 and child.func.value.id == "httpx"
+                 and not any(keyword.arg is None or keyword.arg in CLIENT_ONLY_KWARGS for keyword in child.keywords)]
+        if not calls:
+            continue
+        edits += [(name.lineno, _char_column(lines[name.lineno - 1], name.col_offset), "httpx", CLIENT_FIXTURE)
+                  for name in calls]
+        if CLIENT_FIXTURE not in params:
+            # Insert the fixture as the first parameter, right after "def name("
+            line = lines[node.lineno - 1]
+            column = line.index("(", line.index(f"def {node.name}")) + 1
+            has_params = bool(params or node.args.vararg or node.args.kwarg)
+            edits.append((node.lineno, column, "", CLIENT_FIXTURE + (", " if has_params else "")))
+
+    for row, column, old, new in sorted(edits, reverse=True):
+        line = lines[row - 1]
+        lines[row - 1] = line[:column] + new + line[column + len(old):]
+    return "".join(lines), sum(1 for edit in edits if edit[2])
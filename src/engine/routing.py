@@ -0,0 +1,164 @@
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional
+from .llm import get_llm, invoke_llm, is_rate_limit_error
+from . import telemetry
+
+# "tiered" (default): cheap model first, strong model on failure; "strong" / "fast": a single tier
+ROUTING_ENV = "AXIOM_ROUTING"
+FAST_MODEL_ENV = "AXIOM_FAST_MODEL"
+STRONG_MODEL_ENV = "AXIOM_STRONG_MODEL"
+ROUTING_MODES = ("tiered", "strong", "fast")
+
+DEFAULT_FAST_MODEL = "gpt-4o-mini"
+DEFAULT_STRONG_MODEL = "gpt-4-turbo"
+
+FAST = "fast"
+STRONG = "strong"
+
+# Stages that always go to the strong model: a repair is already the fallback for a bad answer
+STRONG_STAGES = ("repair",)
+
+# Signals that a requirement needs careful reasoning (auth, security, concurrency, money)
+_HARD_TERMS = re.compile(
+    r"\b(auth\w*|jwt|token|oauth|permission\w*|role\w*|admin|password|encrypt\w*|secur\w*|inject\w*|xss|csrf|"
+    r"sanitiz\w*|rate[- ]limit\w*|concurren\w*|race|idempoten\w*|transaction\w*|payment\w*|refund\w*|pii)\b",
+    re.IGNORECASE)
+
+_mode = os.getenv(ROUTING_ENV, "tiered")
+
+
+def set_routing(mode: str):
+    """Selects the routing mode for routers created afterwards (see ROUTING_MODES)."""
+    global _mode
+    if mode not in ROUTING_MODES:
+        raise ValueError(f"Unknown routing mode {mode!r}; expected one of {', '.join(ROUTING_MODES)}")
+    _mode = mode
+
+
+def complexity(text: str, priority: Optional[str] = None) -> float:
+    """
+    Cheap 0..1 estimate of how hard a requirement or scenario is to get right: security/auth-related
+    terms, the number of clauses and steps, and the priority all push it up.
+    """
+    hard_terms = len(set(match.lower() for match in _HARD_TERMS.findall(text)))
+    clauses = len(re.findall(r"\b(?:and|or|unless|except|only if)\b|\n\s*(?:[-*]|\d+\.)\s", text, re.IGNORECASE))
+    score = 0.12 * min(hard_terms, 4) + 0.05 * min(clauses, 5) + min(len(text), 2000) / 8000
+    if priority and priority.lower() in ("high", "critical"):
+        score += 0.1
+    return min(1.0, score)
+
+
+class RouteStats:
+    """
+    Process-wide latency and success counts per (stage, tier), shared by every router. Latencies
+    (p50, max) cover the last `window` calls per route, so long-lived processes (the job manager
+    behind the UI) stay bounded.
+    """
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.routes = {}
+
+    def record(self, stage: str, tier: str, model: str, seconds: float, ok: bool):
+        with self._lock:
+            route = self.routes.get((stage, tier))
+            if route is None:
+                route = self.routes[(stage, tier)] = {"model": model, "calls": 0, "ok": 0,
+                                                      "latencies": deque(maxlen=self.window)}
+            route["calls"] += 1
+            route["ok"] += int(ok)
+            route["latencies"].append(seconds)
+
+    def snapshot(self) -> List[dict]:
+        rows = []
+        with self._lock:
+            for (stage, tier), route in sorted(self.routes.items()):
+                latencies = sorted(route["latencies"])
+                rows.append({
+                    "stage": stage,
+                    "tier": tier,
+                    "model": route["model"],
+                    "calls": route["calls"],
+                    "success_rate": round(route["ok"] / route["calls"], 3),
+                    "p50_s": round(latencies[len(latencies) // 2], 4),
+                    "max_s": round(latencies[-1], 4),
+                })
+        return rows
+
+
+stats = RouteStats()
+
+
+class ModelRouter:
+    """
+    Picks the model for each LLM call. In "tiered" mode a call goes to the fast model first and is
+    escalated to the strong one when the answer does not parse, fails the caller's `check` (e.g. the
+    generated test does not compile) or the input's complexity is at least `complexity_threshold`.
+    Provider errors (rate limits, connection failures) are not escalated: the strong model would fail
+    the same way. Every attempt is timed and counted per (stage, tier), in the run report
+    (`routing.calls`, `routing.latency_s`, `routing.escalations`) and in `routing.stats`.
+    """
+    def __init__(self, api_key: str = None, fast_model: str = None, strong_model: str = None, mode: str = None,
+                 complexity_threshold: float = 0.5):
+        self.mode = mode or _mode
+        if self.mode not in ROUTING_MODES:
+            raise ValueError(f"Unknown routing mode {self.mode!r}; expected one of {', '.join(ROUTING_MODES)}")
+        self.complexity_threshold = complexity_threshold
+        self.models = {
+            FAST: fast_model or os.getenv(FAST_MODEL_ENV, DEFAULT_FAST_MODEL),
+            STRONG: strong_model or os.getenv(STRONG_MODEL_ENV, DEFAULT_STRONG_MODEL),
+        }
+        # get_llm shares the clients with every other router using the same key and models
+        self.llms = {tier: get_llm(api_key, model=model) for tier, model in self.models.items() if self._uses(tier)}
+
+    def _uses(self, tier: str) -> bool:
+        return self.mode == "tiered" or self.mode == tier
+
+    def tiers(self, stage: str, complexity_score: float = 0.0) -> List[str]:
+        """The tiers a call is tried on, in order."""
+        if self.mode != "tiered":
+            return [self.mode]
+        if stage in STRONG_STAGES or complexity_score >= self.complexity_threshold:
+            return [STRONG]
+        return [FAST, STRONG]
+
+    def invoke(self, stage: str, prompt, inputs: dict, output_parser=None, cache=None, complexity_score: float = 0.0,
+               check: Callable[[object], Optional[str]] = None):
+        """
+        Like invoke_llm, routed: `check(result)` may return an error message to reject a fast-tier
+        answer. The last tier's answer is returned even if it fails the check; its errors propagate.
+        """
+        tiers = self.tiers(stage, complexity_score)
+        for position, tier in enumerate(tiers):
+            last = position == len(tiers) - 1
+            llm = self.llms[tier]
+            model = self.models[tier]
+            start = time.perf_counter()
+            try:
+                result = invoke_llm(llm, prompt, inputs, output_parser=output_parser, cache=cache)
+                problem = check(result) if check is not None else None
+            except Exception as e:
+                self._record(stage, tier, model, start, ok=False)
+                if last or is_rate_limit_error(e):
+                    raise
+                problem = f"{type(e).__name__}: {e}"
+            else:
+                self._record(stage, tier, model, start, ok=not problem)
+                if not problem or last:
+                    return result
+            telemetry.incr("routing.escalations", stage=stage, reason=problem.split(":", 1)[0][:60])
+
+    @staticmethod
+    def _record(stage: str, tier: str, model: str, start: float, ok: bool):
+        seconds = time.perf_counter() - start
+        stats.record(stage, tier, model, seconds, ok)
+        telemetry.incr("routing.calls", stage=stage, tier=tier, outcome="ok" if ok else "rejected")
+        telemetry.incr("routing.latency_s", seconds, stage=stage, tier=tier)
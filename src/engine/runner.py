@@ -0,0 +1,226 @@
+"""
+Parallel runner for generated suites.
+
+Usage: python -m src.engine.runner tests/generated_suite_test.py [--workers N] [--host URL] [--report run.json]
+       [--impacted [--openapi FILE|URL|module:app] [--service-version REV]]
+
+Shards the suite's tests across several pytest processes, balancing shards with the durations recorded
+by previous runs (stored next to the suite, e.g. tests/generated_suite_test.timings.json), and merges
+the per-shard JUnit XML into one report. With --impacted, only tests whose code or called endpoints
+changed since their last recorded result are executed (see impact.py); the rest reuse that result.
+"""
+import argparse
+import ast
+import heapq
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+DEFAULT_DURATION = 1.0
+WORKERS_ENV = "AXIOM_TEST_WORKERS"
+
+
+def timings_path_for(test_file: str) -> str:
+    """Timings live next to the generated suite, e.g. tests/generated_suite_test.timings.json."""
+    return os.path.splitext(test_file)[0] + ".timings.json"
+
+
+def load_timings(path: str) -> Dict[str, float]:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_timings(path: str, timings: Dict[str, float]):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(timings, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def collect_tests(test_file: str) -> List[str]:
+    """Top-level test function names, read statically so collection costs no pytest startup."""
+    with open(test_file, "r") as f:
+        tree = ast.parse(f.read(), filename=test_file)
+    return [node.name for node in tree.body
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith("test")]
+
+
+def plan_shards(tests: List[str], timings: Dict[str, float], workers: int) -> List[List[str]]:
+    """
+    Longest-processing-time-first: tests are placed, slowest first, on the currently lightest shard.
+    Tests without a recorded duration are assumed to take the median of the known ones.
+    """
+    known = sorted(timings[name] for name in tests if name in timings)
+    default = known[len(known) // 2] if known else DEFAULT_DURATION
+    workers = max(1, min(workers, len(tests)))
+
+    heap = [(0.0, index) for index in range(workers)]
+    shards: List[List[str]] = [[] for _ in range(workers)]
+    for name in sorted(tests, key=lambda name: timings.get(name, default), reverse=True):
+        load, index = heapq.heappop(heap)
+        shards[index].append(name)
+        heapq.heappush(heap, (load + timings.get(name, default), index))
+    return [shard for shard in shards if shard]
+
+
+def parse_junit(path: str, shard: int) -> List[dict]:
+    results = []
+    if not os.path.exists(path):
+        return results
+    for case in ET.parse(path).getroot().iter("testcase"):
+        outcome, message = "passed", ""
+        for tag in ("failure", "error", "skipped"):
+            element = case.find(tag)
+            if element is not None:
+                outcome = {"failure": "failed", "error": "error", "skipped": "skipped"}[tag]
+                message = element.get("message") or (element.text or "").strip()
+                break
+        results.append({"name": case.get("name"), "outcome": outcome, "duration_s": float(case.get("time") or 0),
+                        "message": message, "shard": shard})
+    return results
+
+
+def run_shard(test_file: str, tests: List[str], shard: int, junit_path: str, env: dict) -> dict:
+    cmd = [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", f"--junitxml={junit_path}"]
+    cmd += [f"{test_file}::{name}" for name in tests]
+    start = time.perf_counter()
+    result = subprocess.run(cmd, capture_output=True, text=True, env=env)
+    return {"shard": shard, "tests": len(tests), "returncode": result.returncode,
+            "wall_s": round(time.perf_counter() - start, 3), "stdout": result.stdout, "stderr": result.stderr,
+            "results": parse_junit(junit_path, shard)}
+
+
+def run_suite(test_file: str, workers: int = None, target_host: str = None, timings_file: str = None,
+              impacted: bool = False, openapi: str = None, service_version: str = None) -> dict:
+    """
+    Runs `test_file` in up to `workers` parallel pytest processes against `target_host` (default:
+    AXIOM_TARGET_HOST) and returns the merged report. Recorded timings are refreshed afterwards.
+    With `impacted`, tests whose code hash and endpoint fingerprints (from the service's OpenAPI
+    schema, see impact.load_openapi for `openapi`) match a stored result are not run; their stored
+    results are merged into the report with `"cached": true`.
+    """
+    workers = workers or int(os.getenv(WORKERS_ENV, "0")) or os.cpu_count() or 1
+    timings_file = timings_file or timings_path_for(test_file)
+    timings = load_timings(timings_file)
+    tests = collect_tests(test_file)
+
+    selected, reused, keys, store = tests, [], {}, None
+    if impacted:
+        from .impact import ResultStore, ServiceFingerprint, load_openapi, map_tests, results_path_for
+        test_map = map_tests(test_file)
+        # Without an explicit host the suite's own default applies, which the code hash already covers
+        fingerprint = ServiceFingerprint(load_openapi(openapi, target_host), service_version,
+                                         target_host or os.getenv("AXIOM_TARGET_HOST"))
+        store = ResultStore(results_path_for(test_file))
+        keys = {name: fingerprint.test_key(test_map[name]) for name in tests}
+        selected = [name for name in tests if store.get(keys[name]) is None]
+        reused = [dict(result, cached=True) for name in tests if name not in selected for result in store.get(keys[name])]
+        print(f"Impact selection: running {len(selected)} of {len(tests)} tests, reusing {len(tests) - len(selected)} stored results.")
+    shards = plan_shards(selected, timings, workers)
+
+    env = dict(os.environ)
+    if target_host:
+        env["AXIOM_TARGET_HOST"] = target_host
+    # Shards run as distinct tenants of the target (see pooling.CLIENT_FIXTURES), named after this run
+    run_id = env.get("AXIOM_TENANT") or os.urandom(4).hex()
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp, ThreadPoolExecutor(max_workers=max(1, len(shards))) as pool:
+        futures = [pool.submit(run_shard, test_file, shard, index, os.path.join(tmp, f"shard-{index}.xml"),
+                               dict(env, AXIOM_TENANT=f"{run_id}-shard{index}"))
+                   for index, shard in enumerate(shards)]
+        shard_reports = [future.result() for future in futures]
+    wall = time.perf_counter() - start
+
+    results = [result for shard in shard_reports for result in shard.pop("results")]
+    # A shard that crashed before writing results still fails the run
+    crashed = [shard["shard"] for shard in shard_reports if shard["returncode"] not in (0, 1)]
+    if store is not None:
+        by_test: Dict[str, List[dict]] = {}
+        for result in results:
+            by_test.setdefault(result["name"].split("[", 1)[0], []).append(result)
+        crashed_tests = {name for index in crashed for name in shards[index]}
+        for name, test_results in by_test.items():
+            if keys.get(name) and name not in crashed_tests:
+                store.put(keys[name], name, test_results)
+        store.save({key for key in keys.values() if key})
+
+    durations: Dict[str, float] = {}
+    for result in results:
+        # Parametrized ids ("test_x[a]") are timed under their function name, which is what gets sharded
+        name = result["name"].split("[", 1)[0]
+        durations[name] = round(durations.get(name, 0) + result["duration_s"], 6)
+    if durations:
+        timings.update(durations)
+        save_timings(timings_file, {name: duration for name, duration in timings.items() if name in tests})
+
+    serial = sum(result["duration_s"] for result in results)
+    results += reused
+    counts = {outcome: sum(1 for result in results if result["outcome"] == outcome)
+              for outcome in ("passed", "failed", "error", "skipped")}
+    return {
+        "test_file": test_file,
+        "collected": len(tests),
+        "selected": len(selected),
+        "reused": len(tests) - len(selected),
+        "workers": len(shards),
+        "wall_s": round(wall, 3),
+        "serial_s": round(serial, 3),
+        **counts,
+        "crashed_shards": crashed,
+        "ok": not counts["failed"] and not counts["error"] and not crashed,
+        "tests": sorted(results, key=lambda result: result["name"]),
+        "shards": shard_reports,
+    }
+
+
+def print_report(report: dict):
+    for result in report["tests"]:
+        if result["outcome"] in ("failed", "error"):
+            print(f"{result['outcome'].upper()} {report['test_file']}::{result['name']} - {result['message'].splitlines()[0] if result['message'] else ''}")
+    for shard in report["shards"]:
+        if shard["shard"] in report["crashed_shards"]:
+            print(f"Shard {shard['shard']} exited with {shard['returncode']}:\n{shard['stdout']}{shard['stderr']}")
+    reused = f", {report['reused']} of {report['collected']} tests reused from previous runs" if report.get("reused") else ""
+    print(f"{report['passed']} passed, {report['failed']} failed, {report['error']} errors, {report['skipped']} skipped "
+          f"in {report['wall_s']}s ({report['workers']} workers, {report['serial_s']}s serial{reused})")
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Run a generated pytest suite in parallel shards.")
+    arg_parser.add_argument("test_file", help="Path of the generated pytest file")
+    arg_parser.add_argument("--workers", type=int, default=None,
+                            help=f"Parallel pytest processes (default: ${WORKERS_ENV} or CPU count)")
+    arg_parser.add_argument("--host", default=None, help="Target service base URL (default: $AXIOM_TARGET_HOST)")
+    arg_parser.add_argument("--timings", default=None, help="Timings file used for shard balancing")
+    arg_parser.add_argument("--report", default=None, help="Write the merged report as JSON to this path")
+    arg_parser.add_argument("--impacted", action="store_true",
+                            help="Only run tests whose code or called endpoints changed; reuse stored results for the rest")
+    arg_parser.add_argument("--openapi", default=None,
+                            help="OpenAPI schema for --impacted: JSON file, URL or module:app (default: <host>/openapi.json)")
+    arg_parser.add_argument("--service-version", default=os.getenv("AXIOM_SERVICE_VERSION", ""),
+                            help="Extra service fingerprint for --impacted, e.g. its git revision (default: $AXIOM_SERVICE_VERSION)")
+    args = arg_parser.parse_args(argv)
+
+    report = run_suite(args.test_file, workers=args.workers, target_host=args.host, timings_file=args.timings,
+                       impacted=args.impacted, openapi=args.openapi, service_version=args.service_version)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
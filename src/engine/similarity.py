@@ -0,0 +1,228 @@
+import ast
+import hashlib
+import re
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from .validation import normalize_code
+
+if TYPE_CHECKING:
+    from .models import Requirement, TestCase, TestScenario
+
+# Words, paths and `code spans`; whitespace and punctuation between them are ignored
+_TOKEN_RE = re.compile(r"`[^`]*`|[\w/.\-]+")
+
+# Alias test cases stand in for a variant covered by its canonical test's parametrization
+ALIAS_DESCRIPTION_PREFIX = "Parametrized variant covered by "
+
+
+def _tokens(req: "Requirement") -> List[str]:
+    return _TOKEN_RE.findall(f"{req.title}\n{req.description}")
+
+
+def _is_value(token: str) -> bool:
+    """Tokens that name a concrete value (ids, status codes, paths, quoted literals) rather than behaviour."""
+    return token.startswith("`") or any(char.isdigit() for char in token) or "/" in token
+
+
+def _value(token: str) -> str:
+    return token.strip("`")
+
+
+def fingerprint_shape(req: "Requirement") -> str:
+    """Hash of the requirement's text with every value token masked, so variants of one AC share it."""
+    shape = " ".join("<v>" if _is_value(token) else token.lower() for token in _tokens(req))
+    return hashlib.sha256(shape.encode("utf-8")).hexdigest()
+
+
+def _slots(canonical: "Requirement", variant: "Requirement") -> List[Tuple[str, str]]:
+    """(canonical value, variant value) for every position where the two requirements differ."""
+    slots: List[Tuple[str, str]] = []
+    for left, right in zip(_tokens(canonical), _tokens(variant)):
+        pair = (_value(left), _value(right))
+        if left != right and pair not in slots:
+            slots.append(pair)
+    return slots
+
+
+def find_clusters(requirements: List["Requirement"]) -> List[List[int]]:
+    """
+    Groups near-duplicate requirements: ones whose text is identical once value tokens (ids, status
+    codes, paths, `literals`) are masked. Returns index lists in first-seen order, canonical first;
+    unique requirements form singleton clusters.
+    """
+    clusters: Dict[str, List[int]] = {}
+    for index, req in enumerate(requirements):
+        clusters.setdefault(fingerprint_shape(req), []).append(index)
+    return list(clusters.values())
+
+
+def _mentions(text: str, value: str) -> bool:
+    return re.search(rf"(?<![\w]){re.escape(value)}(?![\w])", text) is not None
+
+
+def _substitute(text: str, slots: List[Tuple[str, str]]) -> str:
+    for old, new in sorted(slots, key=lambda slot: len(slot[0]), reverse=True):
+        text = re.sub(rf"(?<![\w/]){re.escape(old)}(?![\w])", new, text)
+    return text
+
+
+def derive_scenario(canonical: "TestScenario", canonical_req: "Requirement", variant: "Requirement") -> "TestScenario":
+    """The canonical scenario with the variant's values substituted in, without an LLM call."""
+    slots = _slots(canonical_req, variant)
+    return canonical.copy(update={
+        "requirement_id": variant.id,
+        "scenario_id": f"{canonical.scenario_id}-{variant.id}",
+        "description": _substitute(canonical.description, slots),
+        "steps": [_substitute(step, slots) for step in canonical.steps],
+        "expected_result": _substitute(canonical.expected_result, slots),
+    })
+
+
+def alias_test_case(canonical: "TestCase", variant: "Requirement", scenario_id: str) -> "TestCase":
+    return canonical.copy(update={
+        "requirement_id": variant.id,
+        "scenario_id": scenario_id,
+        "test_function_name": f"{canonical.test_function_name}[{variant.id}]",
+        "code": "",
+        "description": f"{ALIAS_DESCRIPTION_PREFIX}{canonical.requirement_id}",
+    })
+
+
+def alias_of(test_case: "TestCase") -> Optional[str]:
+    """The canonical requirement id if `test_case` is an alias (see alias_test_case), else None."""
+    description = test_case.description or ""
+    if not test_case.code and description.startswith(ALIAS_DESCRIPTION_PREFIX):
+        return description[len(ALIAS_DESCRIPTION_PREFIX):]
+    return None
+
+
+def _is_url(text: str) -> bool:
+    return text.startswith("/") or "://" in text
+
+
+class _SlotRewriter(ast.NodeTransformer):
+    """
+    Replaces canonical values inside URL and path literals with references to parameters. Any other
+    literal mentioning a value (a number, a request body string, ...) might only match by coincidence,
+    so it is left alone and marks the test as unsafe to parametrize (`blocked`). Assertion messages
+    are left alone without blocking.
+    """
+    def __init__(self, values: List[str], names: List[str]):
+        self.names = dict(zip(values, names))
+        self.pattern = re.compile("|".join(rf"(?<![\w/]){re.escape(value)}(?![\w])"
+                                           for value in sorted(values, key=len, reverse=True)))
+        self.used = set()
+        self.blocked = False
+
+    def _split(self, text: str) -> Optional[List[ast.AST]]:
+        parts, last = [], 0
+        for match in self.pattern.finditer(text):
+            if match.start() > last:
+                parts.append(ast.Constant(text[last:match.start()]))
+            name = self.names[match.group(0)]
+            self.used.add(name)
+            parts.append(ast.FormattedValue(ast.Name(name, ast.Load()), -1, None))
+            last = match.end()
+        if not last:
+            return None
+        if last < len(text):
+            parts.append(ast.Constant(text[last:]))
+        return parts
+
+    def visit_Assert(self, node: ast.Assert):
+        node.test = self.visit(node.test)
+        return node
+
+    def visit_JoinedStr(self, node: ast.JoinedStr):
+        first = node.values[0] if node.values else None
+        is_url = (isinstance(first, ast.FormattedValue) and isinstance(first.value, ast.Name)
+                  and first.value.id == "BASE_URL") or any(
+            isinstance(part, ast.Constant) and _is_url(part.value) for part in node.values)
+        values = []
+        for part in node.values:
+            if not isinstance(part, ast.Constant):
+                values.append(self.visit(part))
+                continue
+            if not is_url:
+                self.blocked = self.blocked or bool(self.pattern.search(part.value))
+                values.append(part)
+                continue
+            values.extend(self._split(part.value) or [part])
+        node.values = values
+        return node
+
+    def visit_Constant(self, node: ast.Constant):
+        if isinstance(node.value, str):
+            if not _is_url(node.value):
+                self.blocked = self.blocked or bool(self.pattern.search(node.value))
+                return node
+            split = self._split(node.value)
+            if split and len(split) == 1:
+                return split[0].value
+            return ast.JoinedStr(split) if split else node
+        if isinstance(node.value, (int, float)) and not isinstance(node.value, bool) \
+                and self.pattern.fullmatch(str(node.value)):
+            self.blocked = True
+        return node
+
+
+def parametrize_variants(test_case: "TestCase", canonical_req: "Requirement",
+                         variants: List["Requirement"]) -> Tuple[Optional[str], List["Requirement"]]:
+    """
+    Turns the canonical test into a `pytest.mark.parametrize`d one covering `variants`, by replacing the
+    canonical's value tokens in its URL literals with parameters. Returns the new code and the variants it
+    covers; variants whose differences do not show up in the code are left out (and need their own
+    test). Returns (None, []) if the test cannot be parametrized safely.
+    """
+    try:
+        code = normalize_code(test_case.code)
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None, []
+    functions = [node for node in tree.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+                 and node.name.startswith("test")]
+    if len(functions) != 1 or any("parametrize" in ast.unparse(decorator) for decorator in functions[0].decorator_list):
+        return None, []
+    function = functions[0]
+
+    variant_slots = {variant.id: dict(_slots(canonical_req, variant)) for variant in variants}
+    values = sorted({value for slots in variant_slots.values() for value in slots})
+    if not values:
+        return None, []
+    names = [f"variant_{index}" for index in range(len(values))]
+    existing = {arg.arg for arg in function.args.args + function.args.kwonlyargs}
+    if existing & set(names):
+        return None, []
+
+    rewriter = _SlotRewriter(values, names)
+    body = function.body
+    # The docstring stays as it is: it is not evidence that the test exercises a value
+    has_docstring = isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) \
+        and isinstance(body[0].value.value, str)
+    function.body = body[:has_docstring] + [rewriter.visit(statement) for statement in body[has_docstring:]]
+    if rewriter.blocked:
+        return None, []
+    used = [(value, name) for value, name in zip(values, names) if name in rewriter.used]
+    used_values = [value for value, _ in used]
+
+    covered = []
+    for variant in variants:
+        slots = variant_slots[variant.id]
+        # A difference the code never mentions must be implied by one it does (e.g. "1" inside "/items/1")
+        if all(old in used_values or any(_mentions(other, old) and _mentions(slots.get(other, other), new)
+                                         for other in used_values)
+               for old, new in slots.items()):
+            covered.append(variant)
+    if not covered or not used:
+        return None, []
+
+    rows = [(canonical_req.id, [value for value, _ in used])]
+    rows += [(variant.id, [variant_slots[variant.id].get(value, value) for value, _ in used]) for variant in covered]
+    argnames = ",".join(name for _, name in used)
+    params = ", ".join(f"pytest.param({', '.join(repr(value) for value in row)}, id={req_id!r})" for req_id, row in rows)
+    function.args.args.extend(ast.arg(name) for _, name in used)
+    function.decorator_list.insert(0, ast.parse(f"pytest.mark.parametrize({argnames!r}, [{params}])", mode="eval").body)
+
+    start = min([function.lineno] + [decorator.lineno for decorator in function.decorator_list[1:]])
+    lines = code.splitlines(keepends=True)
+    rewritten = "".join(lines[:start - 1]) + ast.unparse(function) + "\n" + "".join(lines[function.end_lineno:])
+    return rewritten, covered
@@ -0,0 +1,164 @@
+import contextvars
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+
+class Tracer:
+    """
+    Collects span timings and counters for one engine run.
+    Spans are recorded per stage (parse, analyze, write_test, compose, ...) with attributes such as the
+    requirement id; counters track LLM calls, token estimates, retries, cache hits and fallbacks.
+    """
+    def __init__(self):
+        self.started = time.time()
+        self._origin = time.perf_counter()
+        self.spans: List[dict] = []
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            record = {"name": name, "start_s": round(start - self._origin, 6),
+                      "duration_s": round(time.perf_counter() - start, 6), "status": status}
+            record.update(attrs)
+            with self._lock:
+                self.spans.append(record)
+
+    def incr(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def counter(self, name: str, **labels) -> float:
+        """Sum of a counter across all label sets matching `labels`."""
+        wanted = {(k, str(v)) for k, v in labels.items()}
+        with self._lock:
+            return sum(value for (counter_name, counter_labels), value in self.counters.items()
+                       if counter_name == name and wanted <= set(counter_labels))
+
+    def stages(self) -> Dict[str, dict]:
+        """Per-stage aggregates over all spans: count, total, max and error count."""
+        stages: Dict[str, dict] = {}
+        with self._lock:
+            spans = list(self.spans)
+        for record in spans:
+            stage = stages.setdefault(record["name"], {"count": 0, "total_s": 0.0, "max_s": 0.0, "errors": 0})
+            stage["count"] += 1
+            stage["total_s"] = round(stage["total_s"] + record["duration_s"], 6)
+            stage["max_s"] = max(stage["max_s"], record["duration_s"])
+            stage["errors"] += record["status"] == "error"
+        return stages
+
+    def report(self) -> dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda record: record["start_s"])
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in sorted(self.counters.items())]
+        return {"started": self.started, "stages": self.stages(), "counters": counters, "spans": spans}
+
+    def to_json(self, **extra) -> str:
+        report = self.report()
+        report.update(extra)
+        return json.dumps(report, indent=2)
+
+    def to_prometheus(self, prefix: str = "axiom") -> str:
+        return prometheus_text(self.report(), prefix)
+
+
+def prometheus_text(report: dict, prefix: str = "axiom") -> str:
+    """Renders a Tracer.report() (or a run_engine report) in the Prometheus text exposition format."""
+    lines = [f"# TYPE {prefix}_stage_duration_seconds summary"]
+    for name, stage in sorted(report["stages"].items()):
+        lines.append(f'{prefix}_stage_duration_seconds_sum{{stage="{name}"}} {stage["total_s"]}')
+        lines.append(f'{prefix}_stage_duration_seconds_count{{stage="{name}"}} {stage["count"]}')
+
+    declared = set()
+    for counter in report["counters"]:
+        metric = f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', counter['name'])}_total"
+        if metric not in declared:
+            lines.append(f"# TYPE {metric} counter")
+            declared.add(metric)
+        label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(counter["labels"].items()))
+        lines.append(f"{metric}{{{label_text}}} {counter['value']}" if label_text else f"{metric} {counter['value']}")
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _NullTracer(Tracer):
+    """Used when no run is being traced; records nothing."""
+    @contextmanager
+    def span(self, name: str, **attrs):
+        yield
+
+    def incr(self, name: str, value: float = 1, **labels):
+        pass
+
+
+_NULL_TRACER = _NullTracer()
+_current: contextvars.ContextVar = contextvars.ContextVar("axiom_tracer", default=_NULL_TRACER)
+
+
+def current_tracer() -> Tracer:
+    return _current.get()
+
+
+@contextmanager
+def use_tracer(tracer: Tracer):
+    """Makes `tracer` the target of span()/incr() for the enclosed block (and threads started via bind())."""
+    token = _current.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _current.reset(token)
+
+
+def span(name: str, **attrs):
+    return _current.get().span(name, **attrs)
+
+
+def incr(name: str, value: float = 1, **labels):
+    _current.get().incr(name, value, **labels)
+
+
+def bind(fn: Callable) -> Callable:
+    """Wraps `fn` so it runs with the caller's tracer when executed on a worker thread."""
+    context = contextvars.copy_context()
+
+    def wrapper(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return wrapper
+
+
+def iterate_with_tracer(tracer: Tracer, iterator: Iterator) -> Iterator:
+    """
+    Drives `iterator` (typically a generator) with `tracer` active only while it runs, so a streaming
+    run is traced without the tracer leaking into the consumer's code between items.
+    """
+    context = contextvars.copy_context()
+    context.run(_current.set, tracer)
+    try:
+        while True:
+            try:
+                item = context.run(next, iterator)
+            except StopIteration:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            context.run(close)
@@ -0,0 +1,34 @@
+import ast
+import re
+import textwrap
+from typing import Optional
+
+_FENCE_RE = re.compile(r"^\s*```[\w-]*\s*$", re.MULTILINE)
+
+
+def normalize_code(code: str) -> str:
+    """Strips Markdown fences and common indentation from a generated snippet."""
+    code = _FENCE_RE.sub("", code)
+    return textwrap.dedent(code).strip("\n") + "\n"
+
+
+def validate_test_code(code: str) -> Optional[str]:
+    """
+    Compiles a generated test snippet and checks it defines at least one top-level test function.
+    Returns None if it is usable, otherwise an error message suitable for a repair prompt.
+    """
+    code = normalize_code(code)
+    try:
+        # compile() also catches errors ast.parse lets through, e.g. `await` outside an async function
+        compile(code, "<generated test>", "exec", dont_inherit=True)
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        line = (e.text or "").strip()
+        return f"SyntaxError: {e.msg} (line {e.lineno}: {line})" if line else f"SyntaxError: {e.msg} (line {e.lineno})"
+    except ValueError as e:
+        return f"ValueError: {e}"
+
+    if not any(isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith("test")
+               for node in tree.body):
+        return "No top-level pytest function (def test_...) found"
+    return None
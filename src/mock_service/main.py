@@ -1,4 +1,13 @@
-from fastapi import FastAPI, HTTPException, Header
+import copy
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from fastapi import FastAPI, HTTPException, Header, Query
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional
 
@@ -23,15 +32,146 @@ async def custom_404_handler(request, exc):
         content={"message": "page-not-found"},
     )
 
-# -- In-Memory Database --
-fake_db = {
-    "user": {
-        "email": "user@example.com",
-        "full_name": "John Doe",
-        "account_tier": "gold"
-    }
+# -- Tenant-Scoped State --
+# Every tenant (the X-Axiom-Tenant header, else the bearer token) gets its own copy of the profile,
+# so parallel shards, load runs and reruns never see each other's writes.
+TENANT_HEADER = "X-Axiom-Tenant"
+DEFAULT_TENANT = "default"
+MAX_TENANTS = int(os.getenv("MOCK_MAX_TENANTS", "10000"))
+
+
+def _is_worker_process() -> bool:
+    """
+    True when this process is (probably) one of several server workers, which only agree on state
+    through a shared store: `uvicorn --workers N` (and --reload) spawns each worker with multiprocessing,
+    WEB_CONCURRENCY is uvicorn's default worker count, and gunicorn announces itself in SERVER_SOFTWARE.
+    """
+    return (multiprocessing.parent_process() is not None
+            or int(os.getenv("WEB_CONCURRENCY") or "1") > 1
+            or "gunicorn" in os.getenv("SERVER_SOFTWARE", ""))
+
+
+# A SQLite file shares state between worker processes. Set MOCK_STATE_DB to choose it; otherwise workers
+# get one next to their parent process's id, so the workers of one server share it and a restart starts clean
+STATE_DB = os.getenv("MOCK_STATE_DB") or (
+    os.path.join(tempfile.gettempdir(), f"axiom_mock_state_{os.getppid()}.db") if _is_worker_process() else None)
+
+DEFAULT_USER = {
+    "email": "user@example.com",
+    "full_name": "John Doe",
+    "account_tier": "gold"
 }
 
+
+class MemoryStore:
+    """Per-tenant profiles in process memory; the least recently used tenants are evicted past `max_tenants`."""
+    def __init__(self, max_tenants: int):
+        self.max_tenants = max_tenants
+        self._lock = threading.Lock()
+        self._users = OrderedDict()
+
+    def _user(self, tenant: str) -> dict:
+        if tenant not in self._users:
+            self._users[tenant] = copy.deepcopy(DEFAULT_USER)
+            while len(self._users) > self.max_tenants:
+                self._users.popitem(last=False)
+        self._users.move_to_end(tenant)
+        return self._users[tenant]
+
+    def get(self, tenant: str) -> dict:
+        with self._lock:
+            return dict(self._user(tenant))
+
+    def update(self, tenant: str, changes: dict) -> dict:
+        with self._lock:
+            user = self._user(tenant)
+            user.update(changes)
+            return dict(user)
+
+    def reset(self, tenant: Optional[str] = None):
+        with self._lock:
+            if tenant is None:
+                self._users.clear()
+            else:
+                self._users.pop(tenant, None)
+
+
+class SQLiteStore:
+    """
+    Same interface as MemoryStore, backed by one SQLite file so every worker process sees the same state.
+    Calls block (on disk and on other workers' transactions), so handlers run them in the threadpool.
+    Least recently used tenants are evicted in batches, every `evict_every` new tenants per worker.
+    """
+    def __init__(self, path: str, max_tenants: int, evict_every: int = 256):
+        self.max_tenants = max_tenants
+        self.evict_every = evict_every
+        self._inserts = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS users (tenant TEXT PRIMARY KEY, email TEXT, full_name TEXT, "
+                         "account_tier TEXT, touched REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS users_touched ON users (touched)")
+
+    def _user(self, tenant: str) -> dict:
+        row = self._db.execute("SELECT email, full_name, account_tier FROM users WHERE tenant = ?", (tenant,)).fetchone()
+        if row is None:
+            self._db.execute("INSERT INTO users VALUES (?, ?, ?, ?, ?)", (tenant, DEFAULT_USER["email"],
+                             DEFAULT_USER["full_name"], DEFAULT_USER["account_tier"], time.time()))
+            self._inserts += 1
+            if self._inserts % self.evict_every == 0:
+                self._db.execute("DELETE FROM users WHERE touched < "
+                                 "(SELECT touched FROM users ORDER BY touched DESC LIMIT 1 OFFSET ?)",
+                                 (self.max_tenants - 1,))
+            return copy.deepcopy(DEFAULT_USER)
+        self._db.execute("UPDATE users SET touched = ? WHERE tenant = ?", (time.time(), tenant))
+        return {"email": row[0], "full_name": row[1], "account_tier": row[2]}
+
+    def get(self, tenant: str) -> dict:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                return self._user(tenant)
+            finally:
+                self._db.execute("COMMIT")
+
+    def update(self, tenant: str, changes: dict) -> dict:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                user = self._user(tenant)
+                user.update(changes)
+                self._db.execute("UPDATE users SET email = ?, full_name = ? WHERE tenant = ?",
+                                 (user["email"], user["full_name"], tenant))
+                return user
+            finally:
+                self._db.execute("COMMIT")
+
+    def reset(self, tenant: Optional[str] = None):
+        with self._lock:
+            if tenant is None:
+                self._db.execute("DELETE FROM users")
+            else:
+                self._db.execute("DELETE FROM users WHERE tenant = ?", (tenant,))
+
+
+store = SQLiteStore(STATE_DB, MAX_TENANTS) if STATE_DB else MemoryStore(MAX_TENANTS)
+
+
+async def _call(method, *args):
+    """Runs a store call, off the event loop when the store blocks."""
+    if isinstance(store, SQLiteStore):
+        return await run_in_threadpool(method, *args)
+    return method(*args)
+
+
+def tenant_of(tenant_header: Optional[str], authorization: Optional[str]) -> str:
+    if tenant_header:
+        return tenant_header
+    if authorization and authorization.startswith("Bearer "):
+        return "token:" + authorization[len("Bearer "):]
+    return DEFAULT_TENANT
+
 # -- Dependencies --
 async def verify_token(authorization: str = Header(...)):
     if not authorization.startswith("Bearer "):
@@ -43,26 +183,36 @@ async def verify_token(authorization: str = Header(...)):
     return True
 
 @app.get("/profile", response_model=ProfileResponse)
-async def get_profile(authorization: Optional[str] = Header(None)):
+async def get_profile(authorization: Optional[str] = Header(None),
+                      x_axiom_tenant: Optional[str] = Header(None, include_in_schema=False)):
     if not authorization or not authorization.startswith("Bearer "):
          raise HTTPException(status_code=401, detail="Unauthorized")
-    
-    return fake_db["user"]
+
+    return await _call(store.get, tenant_of(x_axiom_tenant, authorization))
 
 @app.put("/profile", response_model=ProfileResponse)
-async def update_profile(update: ProfileUpdate, authorization: Optional[str] = Header(None)):
+async def update_profile(update: ProfileUpdate, authorization: Optional[str] = Header(None),
+                         x_axiom_tenant: Optional[str] = Header(None, include_in_schema=False)):
     if not authorization or not authorization.startswith("Bearer "):
          raise HTTPException(status_code=401, detail="Unauthorized")
-    
-    # INTENTIONAL BUG: No email validation logic here. 
+
+    # INTENTIONAL BUG: No email validation logic here.
     # Usually we would check if '@' in update.email etc., or let Pydantic EmailStr do it.
     # We are using 'str' so anything passes.
-    
-    fake_db["user"]["email"] = update.email
+
+    changes = {"email": update.email}
     if update.full_name:
-        fake_db["user"]["full_name"] = update.full_name
-    return fake_db["user"]
+        changes["full_name"] = update.full_name
+    return await _call(store.update, tenant_of(x_axiom_tenant, authorization), changes)
+
+# Test harness endpoint, kept out of the OpenAPI schema (and so out of test impact fingerprints)
+@app.post("/__reset", status_code=204, include_in_schema=False)
+async def reset_state(reset_all: bool = Query(False, alias="all"), authorization: Optional[str] = Header(None),
+                      x_axiom_tenant: Optional[str] = Header(None)):
+    await _call(store.reset, None if reset_all else tenant_of(x_axiom_tenant, authorization))
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    workers = int(os.getenv("MOCK_WORKERS", "1"))
+    # With several workers, each is spawned as a child process and picks the shared SQLite store itself
+    uvicorn.run("src.mock_service.main:app" if workers > 1 else app, host="0.0.0.0", port=8000, workers=workers)